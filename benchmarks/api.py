@@ -0,0 +1,87 @@
+"""JSON API против HTML-страниц: задержка, запросы и размер ответа.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.api --scale 0.3
+
+Данные те же, что у benchmarks.views. Для каждой пары страниц меряются
+холодный и тёплый кеш, а размер ответа — как есть и со сжатием, которое
+API выбирает по Accept-Encoding (HTML-страницы сервер не сжимает).
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.data import Scale, generate
+from benchmarks.utils import setup_django
+from benchmarks.views import MODES, ClientDriver, measure
+
+
+def scenarios(dataset):
+    from django.urls import reverse
+
+    post = dataset.post.pk
+    return {
+        'index': (reverse('post:index'), reverse('api:index'), None),
+        'group_list': (
+            reverse('post:group_list', args=[dataset.group.slug]),
+            reverse('api:group_list', args=[dataset.group.slug]), None),
+        'profile, популярный автор': (
+            reverse('post:profile', args=[dataset.popular_author.username]),
+            reverse('api:profile', args=[dataset.popular_author.username]),
+            None),
+        'follow_index': (
+            reverse('post:follow_index'), reverse('api:follow_index'),
+            dataset.wide_reader),
+        'post_detail': (
+            reverse('post:post_detail', args=[post]),
+            reverse('api:post_detail', args=[post]), None),
+        'comments': (
+            reverse('post:comments', args=[post]),
+            reverse('api:comments', args=[post]), None),
+    }
+
+
+def sizes(driver, url):
+    raw = len(driver.client.get(url).content)
+    encoded = driver.client.get(url, HTTP_ACCEPT_ENCODING='br, gzip')
+    return raw, len(encoded.content), encoded.get('Content-Encoding', '-')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    handle, database = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    try:
+        setup_django(database)
+        from django.conf import settings
+        from django.core.management import call_command
+
+        settings.DEBUG = False
+        call_command('migrate', verbosity=0)
+        started = time.perf_counter()
+        dataset = generate(Scale().scaled(args.scale), args.seed)
+        print(f'Данные готовы за {time.perf_counter() - started:.1f} с\n')
+        for name, (html_url, api_url, user) in scenarios(dataset).items():
+            driver = ClientDriver(user)
+            for kind, url in (('html', html_url), ('json', api_url)):
+                raw, encoded, encoding = sizes(driver, url)
+                for mode in MODES:
+                    result = measure(driver, url, mode, args.repeat)
+                    print(f'{name:<28} {kind:<4} {mode:<4} '
+                          f'p50 {result["p50_ms"]:>7.2f} ms  '
+                          f'{result["queries"]:>2} SQL  '
+                          f'{raw / 1024:>7.1f} KiB, '
+                          f'{encoding} {encoded / 1024:>6.1f} KiB')
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""WSGI и ASGI под медленными клиентами: пропускная способность и хвост.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.asgi --slow 64 --fast 8 --seconds 10
+
+Сервер с ASGI_THREADS потоками запускается в отдельном процессе: WSGI —
+wsgiref с пулом потоков, как gunicorn --threads, ASGI — yatube.asgi под
+маленьким HTTP-сервером на asyncio (uvicorn и daphne здесь не ставятся).
+Медленные клиенты растягивают отправку заголовков на --trickle-ms,
+быстрые ходят по страницам лент и постов без пауз; для быстрых
+печатаются запросы в секунду и задержки.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from benchmarks.data import Scale, generate
+from benchmarks.utils import percentile, setup_django
+
+MODES = ('wsgi', 'asgi')
+
+
+def serve_wsgi(port, threads):
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class PooledServer(WSGIServer):
+        executor = ThreadPoolExecutor(max_workers=threads)
+        request_queue_size = 1024
+
+        def process_request(self, request, client_address):
+            self.executor.submit(
+                self.process_request_thread, request, client_address)
+
+        def process_request_thread(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server = PooledServer(('127.0.0.1', port), QuietHandler)
+    server.set_app(get_wsgi_application())
+    server.serve_forever()
+
+
+def serve_asgi(port, threads):
+    os.environ['ASGI_THREADS'] = str(threads)
+    from yatube.asgi import application
+
+    async def handle(reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError:
+            writer.close()
+            return
+        lines = head.decode('latin-1').split('\r\n')
+        method, target, version = lines[0].split(' ')
+        headers = [
+            tuple(part.strip().lower().encode('latin-1') if number == 0
+                  else part.strip().encode('latin-1')
+                  for number, part in enumerate(line.split(':', 1)))
+            for line in lines[1:] if line
+        ]
+        length = int(dict(headers).get(b'content-length', 0))
+        body = await reader.readexactly(length) if length else b''
+        path, _, query = target.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'},
+            'http_version': version.split('/')[1], 'method': method,
+            'scheme': 'http', 'path': path, 'root_path': '',
+            'query_string': query.encode('latin-1'), 'headers': headers,
+            'server': ('127.0.0.1', port), 'client': ('127.0.0.1', 0),
+        }
+        messages = [{'type': 'http.request', 'body': body}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status = HTTPStatus(message['status'])
+                writer.write(
+                    f'HTTP/1.1 {status.value} {status.phrase}\r\n'.encode())
+                for name, value in message['headers']:
+                    writer.write(name + b': ' + value + b'\r\n')
+                writer.write(b'Connection: close\r\n\r\n')
+            else:
+                writer.write(message.get('body', b''))
+                await writer.drain()
+
+        await application(scope, receive, send)
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(
+            handle, '127.0.0.1', port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def serve(mode, database, port, threads):
+    setup_django(database)
+    from django.conf import settings
+
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['*']
+    (serve_wsgi if mode == 'wsgi' else serve_asgi)(port, threads)
+
+
+async def request(port, path, trickle=0.0):
+    """Один запрос; с trickle заголовки уходят по байту за trickle с."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = (f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+            f'Connection: close\r\n\r\n').encode()
+    if trickle:
+        step = max(len(data) // 10, 1)
+        for start in range(0, len(data), step):
+            writer.write(data[start:start + step])
+            await writer.drain()
+            await asyncio.sleep(trickle / 10)
+    else:
+        writer.write(data)
+    response = await reader.read()
+    writer.close()
+    return response[9:12]
+
+
+async def load(port, paths, slow, fast, seconds, trickle):
+    deadline = time.perf_counter() + seconds
+    samples, statuses = [], {}
+
+    async def slow_client():
+        while time.perf_counter() < deadline:
+            await request(port, paths[0], trickle)
+
+    async def fast_client(offset):
+        number = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = await request(port, paths[number % len(paths)])
+            samples.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            number += 1
+
+    await asyncio.gather(
+        *(slow_client() for _ in range(slow)),
+        *(fast_client(offset) for offset in range(fast)))
+    return sorted(samples), statuses
+
+
+async def wait_for(port):
+    for _ in range(300):
+        try:
+            await request(port, '/')
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError('Сервер не запустился')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=0.05)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--slow', type=int, default=64)
+    parser.add_argument('--fast', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--trickle-ms', type=float, default=500)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    handle, database = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    try:
+        setup_django(database)
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        dataset = generate(Scale().scaled(args.scale))
+        paths = [
+            '/', f'/group/{dataset.group.slug}/',
+            f'/profile/{dataset.author.username}/',
+            f'/posts/{dataset.post.pk}/',
+        ]
+        context = multiprocessing.get_context('spawn')
+        for mode in MODES:
+            server = context.Process(
+                target=serve,
+                args=(mode, database, args.port, args.threads))
+            server.start()
+            try:
+                asyncio.run(wait_for(args.port))
+                samples, statuses = asyncio.run(load(
+                    args.port, paths, args.slow, args.fast, args.seconds,
+                    args.trickle_ms / 1000))
+            finally:
+                server.terminate()
+                server.join()
+            print(f'{mode}: {len(samples) / args.seconds:>7.1f} запросов/с  '
+                  f'p50 {statistics.median(samples):>8.1f} ms  '
+                  f'p99 {percentile(samples, 0.99):>8.1f} ms  '
+                  f'ответы {statuses}')
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Доля попаданий в кеш ленты и задержка при 1, 4 и 16 воркерах.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.cache_workers --requests 2000
+    python -m benchmarks.cache_workers --cache-url memcached://127.0.0.1:11211
+
+Каждый воркер — отдельный процесс со своим Django, как у gunicorn.
+Запросы к первым страницам главной делятся между воркерами поровну;
+попаданием считается ответ, на который не ушло ни одного запроса
+к таблице постов (запросы бэкенда db:// к своей таблице не в счёт).
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.utils import percentile, setup_django
+
+WORKERS = (1, 4, 16)
+
+
+def seed(posts):
+    from django.contrib.auth import get_user_model
+
+    from posts.models import Post
+
+    author = get_user_model().objects.create_user(username='author')
+    Post.objects.bulk_create(
+        Post(text=f'Post {i}.', author=author) for i in range(posts))
+
+
+def worker(args):
+    database, cache_url, prefix, requests, pages, seed_value = args
+    os.environ['CACHE_URL'] = cache_url
+    os.environ['CACHE_KEY_PREFIX'] = prefix
+    setup_django(database)
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    rnd = random.Random(seed_value)
+    samples, hits = [], 0
+    for _ in range(requests):
+        page = rnd.randrange(pages) + 1
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            client.get('/', {'page': page})
+            samples.append((time.perf_counter() - started) * 1000)
+        hits += not any('posts_post' in query['sql'] for query in queries)
+        connection.queries_log.clear()
+    return samples, hits
+
+
+def run(database, cache_url, workers, requests, pages):
+    prefix = f'bench{time.monotonic_ns()}'
+    tasks = [
+        (database, cache_url, prefix, requests // workers, pages, seed_value)
+        for seed_value in range(workers)
+    ]
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(workers) as pool:
+        results = pool.map(worker, tasks)
+    samples = sorted(sample for result in results for sample in result[0])
+    hits = sum(result[1] for result in results)
+    return (hits / len(samples), statistics.median(samples),
+            percentile(samples, 0.99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument(
+        '--cache-url', action='append', dest='cache_urls',
+        help='адрес кеша, можно несколько; по умолчанию locmem, file и db')
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp()
+    handle, database = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    cache_urls = args.cache_urls or [
+        'locmem://', f'file://{cache_dir}?max_entries=100000',
+        'db://bench_cache?max_entries=100000',
+    ]
+    try:
+        os.environ['CACHE_URL'] = 'db://bench_cache'
+        setup_django(database)
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        call_command('createcachetable', verbosity=0)
+        seed(args.posts)
+        print(f'{"кеш":<40} {"воркеры":>8} {"попадания":>10} '
+              f'{"p50, мс":>8} {"p99, мс":>8}')
+        for cache_url in cache_urls:
+            for workers in WORKERS:
+                hit_rate, p50, p99 = run(
+                    database, cache_url, workers, args.requests, args.pages)
+                print(f'{cache_url.split("?")[0]:<40} {workers:>8} '
+                      f'{hit_rate:>10.1%} {p50:>8.2f} {p99:>8.2f}')
+    finally:
+        os.remove(database)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Всплеск комментариев к одному посту: запись сразу и через буфер.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.comment_burst --threads 16 --comments 50
+
+Потоки одновременно отправляют комментарии в add_comment через
+тестовый клиент, каждый со своим соединением к одной базе SQLite.
+Для каждого режима печатаются задержка ответа, число ошибок и время,
+за которое все комментарии оказались в базе.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.utils import percentile, setup_django
+
+MODES = {'сразу': 0, 'буфер': 0.2}
+
+
+def burst(post, users, comments):
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    url = reverse('post:add_comment', args=[post.pk])
+    clients = []
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        clients.append(client)
+    samples, errors = [], []
+    start = threading.Barrier(len(clients))
+
+    def send(client):
+        start.wait()
+        for number in range(comments):
+            started = time.perf_counter()
+            try:
+                client.post(url, {'text': f'Комментарий {number}.'})
+            except Exception as error:
+                errors.append(error)
+            samples.append((time.perf_counter() - started) * 1000)
+        connection.close()
+
+    threads = [threading.Thread(target=send, args=(client,))
+               for client in clients]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(samples), errors, started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--comments', type=int, default=50,
+                        help='комментариев от каждого потока')
+    args = parser.parse_args()
+
+    handle, database = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    try:
+        setup_django(database)
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+        from django.core.management import call_command
+
+        from posts import comment_buffer
+        from posts.models import Comment, Post
+
+        settings.DEBUG = False
+        # Меряется буфер, а не ограничение частоты комментариев.
+        settings.RATE_LIMITS = {}
+        call_command('migrate', verbosity=0)
+        User = get_user_model()
+        users = [User.objects.create_user(username=f'user{number}')
+                 for number in range(args.threads)]
+        post = Post.objects.create(text='Вирусный пост.', author=users[0])
+        for mode, delay in MODES.items():
+            settings.COMMENT_BUFFER_DELAY = delay
+            Comment.objects.all().delete()
+            Post.objects.filter(pk=post.pk).update(comment_count=0)
+            samples, errors, started = burst(post, users, args.comments)
+            elapsed = time.perf_counter() - started
+            expected = args.threads * args.comments - len(errors)
+            deadline = time.perf_counter() + delay + 30
+            while (Comment.objects.count() < expected
+                   and time.perf_counter() < deadline):
+                time.sleep(0.01)
+            visible = time.perf_counter() - started
+            written = Comment.objects.count()
+            print(f'{mode:<6} p50 {statistics.median(samples):>7.2f} ms  '
+                  f'p99 {percentile(samples, 0.99):>8.2f} ms  '
+                  f'ошибок {len(errors):>4}  '
+                  f'{len(samples) / elapsed:>7.0f} запросов/с  '
+                  f'в базе {written} за {visible:.2f} с')
+            comment_buffer.flush()
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
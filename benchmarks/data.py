@@ -0,0 +1,131 @@
+"""Генератор данных для бенчмарков на mixer.
+
+Распределения приближены к живому сайту: немного популярных авторов
+пишут большую часть постов и собирают тысячи подписчиков, несколько
+читателей подписаны на тысячи авторов, остальные — на десяток.
+Объекты создаются через save(), поэтому сигналы раскладывают ленты,
+считают счётчики и наполняют поисковый индекс, как при обычной работе.
+"""
+import random
+from dataclasses import asdict, dataclass
+
+
+@dataclass
+class Scale:
+    users: int = 2000
+    groups: int = 20
+    posts: int = 10000
+    comments: int = 10000
+    # Популярные авторы: их доля постов и число подписчиков у каждого.
+    popular_authors: int = 5
+    popular_share: float = 0.5
+    popular_followers: int = 1500
+    # Читатели, подписанные на wide_follows авторов каждый.
+    wide_readers: int = 3
+    wide_follows: int = 1500
+    follows_per_user: int = 10
+
+    def scaled(self, factor):
+        return Scale(**{
+            name: max(int(value * factor), 1) if isinstance(value, int)
+            else value
+            for name, value in asdict(self).items()
+        })
+
+
+@dataclass
+class Dataset:
+    """Объекты, на которых удобно мерить страницы."""
+    popular_author: object
+    author: object
+    wide_reader: object
+    reader: object
+    group: object
+    post: object
+
+
+def generate(scale, seed=0, reuse=False):
+    """Заполняет базу и возвращает Dataset; с reuse только читает её."""
+    if not reuse:
+        populate(scale, seed)
+    return load(scale)
+
+
+def follow_pairs(scale, rnd, users):
+    """Пары (читатель, автор) для подписок в порядке первичных ключей."""
+    popular = users[:scale.popular_authors]
+    others = users[scale.popular_authors:]
+    follows = set()
+    for author in popular:
+        for reader in rnd.sample(others, min(
+                scale.popular_followers, len(others))):
+            follows.add((reader, author))
+    for reader in others[:scale.wide_readers]:
+        for author in rnd.sample(users, min(scale.wide_follows, len(users))):
+            follows.add((reader, author))
+    for reader in others[scale.wide_readers:]:
+        for author in rnd.sample(users, scale.follows_per_user):
+            follows.add((reader, author))
+    return sorted(
+        (pair for pair in follows if pair[0] != pair[1]),
+        key=lambda pair: (pair[0].pk, pair[1].pk))
+
+
+def populate(scale, seed):
+    from django.contrib.auth import get_user_model
+    from mixer.backend.django import mixer
+
+    from posts.models import Comment, Follow, Group, Post
+
+    User = get_user_model()
+    rnd = random.Random(seed)
+    mixer.faker.seed_instance(seed)
+
+    users = mixer.cycle(scale.users).blend(
+        User, username=mixer.sequence('user{0}'))
+    groups = mixer.cycle(scale.groups).blend(
+        Group, slug=mixer.sequence('group{0}'))
+    popular = users[:scale.popular_authors]
+    others = users[scale.popular_authors:]
+
+    # Подписки создаются до постов, чтобы посты раскладывались по лентам
+    # при публикации, а популярные авторы стали авторами без раскладки.
+    for reader, author in follow_pairs(scale, rnd, users):
+        mixer.blend(Follow, user=reader, author=author)
+
+    for _ in range(scale.posts):
+        if rnd.random() < scale.popular_share:
+            author = rnd.choice(popular)
+        else:
+            author = rnd.choice(others)
+        mixer.blend(
+            Post, author=author, image='',
+            group=rnd.choice(groups) if rnd.random() < 0.5 else None)
+
+    # Комментарии тяготеют к свежим постам популярных авторов.
+    commented = list(Post.objects.filter(author__in=popular).order_by(
+        '-pk').values_list('pk', flat=True)[:100]) or list(
+        Post.objects.values_list('pk', flat=True)[:100])
+    for _ in range(scale.comments):
+        mixer.blend(
+            Comment, author=rnd.choice(users), post=mixer.SKIP,
+            post_id=commented[int(rnd.paretovariate(1)) % len(commented)])
+
+
+def load(scale):
+    from django.contrib.auth import get_user_model
+
+    from posts.models import Group, Post
+
+    users = list(get_user_model().objects.order_by('pk'))
+    popular = users[:scale.popular_authors]
+    others = users[scale.popular_authors:]
+    wide = others[:scale.wide_readers]
+    return Dataset(
+        popular_author=popular[0],
+        author=others[scale.wide_readers],
+        wide_reader=wide[0],
+        reader=others[-1],
+        group=Group.objects.order_by('pk').first(),
+        post=Post.objects.order_by('-comment_count').first(),
+    )
@@ -0,0 +1,135 @@
+"""Планы и время запросов лент до и после миграции 0007_feed_indexes.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.indexes --posts 1000000
+
+База создаётся во временном файле и заполняется напрямую через SQL,
+без сигналов и auto_now_add, чтобы даты постов были распределены по году.
+"""
+import argparse
+import os
+import random
+import tempfile
+from datetime import timedelta
+
+from benchmarks.utils import setup_django, timed
+
+BATCH_SIZE = 10000
+
+
+def insert_rows(cursor, model, columns, rows):
+    table = model._meta.db_table
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        table, ', '.join(columns), ', '.join(['%s'] * len(columns)))
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+
+
+def seed(posts, seed_value):
+    from django.contrib.auth import get_user_model
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from posts.models import Comment, Follow, Group, Post
+
+    User = get_user_model()
+    rnd = random.Random(seed_value)
+    now = timezone.now()
+    users = max(posts // 100, 10)
+    groups = 50
+    with transaction.atomic(), connection.cursor() as cursor:
+        insert_rows(cursor, User, (
+            'username', 'password', 'first_name', 'last_name', 'email',
+            'is_superuser', 'is_staff', 'is_active', 'date_joined',
+        ), ((f'user{i}', '', '', '', '', False, False, True, now)
+            for i in range(users)))
+        insert_rows(cursor, Group, ('title', 'slug', 'description'), (
+            (f'group{i}', f'group{i}', '') for i in range(groups)))
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        group_ids = list(Group.objects.values_list('pk', flat=True))
+        insert_rows(cursor, Post, (
+            'text', 'pub_date', 'updated', 'author_id', 'group_id', 'image',
+            'comment_count',
+        ), ((f'Post {i}.', date, date, rnd.choice(user_ids),
+             rnd.choice(group_ids + [None]), '', 0)
+            for i, date in (
+                (i, now - timedelta(seconds=rnd.randrange(365 * 86400)))
+                for i in range(posts))))
+        first_post = Post.objects.order_by('pk').values_list(
+            'pk', flat=True).first()
+        insert_rows(cursor, Comment, (
+            'created', 'post_id', 'author_id', 'text',
+        ), ((now, first_post + rnd.randrange(posts), rnd.choice(user_ids),
+             'Comment.') for _ in range(posts // 10)))
+        insert_rows(cursor, Follow, ('user_id', 'author_id'), (
+            (user_id, author_id)
+            for user_id in user_ids
+            for author_id in rnd.sample(user_ids, 20)))
+
+
+def feed_queries():
+    from django.contrib.auth import get_user_model
+
+    from posts.models import Comment, Follow, Group, Post
+    from posts.paginators import older_than
+
+    User = get_user_model()
+    author = User.objects.order_by('pk').first()
+    reader = User.objects.order_by('-pk').first()
+    group = Group.objects.order_by('pk').first()
+    post = Post.objects.order_by('-comment_count', 'pk').first()
+    middle = Post.objects.order_by('-pub_date', '-pk')[
+        Post.objects.count() // 2]
+    ordered = Post.objects.order_by('-pub_date', '-pk')
+    return {
+        'index': ordered[:11],
+        'index, глубокий курсор': ordered.filter(
+            older_than(middle.pub_date, middle.pk))[:11],
+        'group': ordered.filter(group=group)[:11],
+        'profile': ordered.filter(author=author)[:11],
+        'follow': Follow.objects.filter(user=reader, author=author),
+        'comments': Comment.objects.filter(post=post).order_by('created'),
+    }
+
+
+def report(title, repeat):
+    print(f'\n=== {title} ===')
+    for name, queryset in feed_queries().items():
+        elapsed = timed(lambda: list(queryset.all()), repeat)
+        print(f'\n{name}: {elapsed:.2f} ms')
+        for line in queryset.explain().splitlines():
+            print(f'    {line}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    handle, database = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    try:
+        setup_django(database)
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        call_command('migrate', 'posts', '0006', verbosity=0)
+        seed(args.posts, args.seed)
+        report('до 0007_feed_indexes', args.repeat)
+        call_command('migrate', 'posts', verbosity=0)
+        report('после 0007_feed_indexes', args.repeat)
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
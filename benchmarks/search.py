@@ -0,0 +1,121 @@
+"""Поиск по постам: индекс FTS5 против сканирования через LIKE.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.search --posts 1000000
+
+База создаётся во временном файле, посты из случайных слов словаря
+пишутся напрямую через SQL, после чего индекс заполняется командой
+rebuild_search_index.
+"""
+import argparse
+import os
+import random
+import tempfile
+from datetime import timedelta
+
+from benchmarks.indexes import insert_rows
+from benchmarks.utils import setup_django, timed
+
+VOCABULARY = 20000
+
+
+def word(number):
+    return f'w{number:05d}'
+
+
+def words(rnd, count):
+    # Номера слов распределены логарифмически: w00000 есть почти в каждом
+    # посте, как союз, w00010 — примерно в каждом пятом, w00100 —
+    # в каждом пятидесятом, а конец словаря почти не встречается.
+    return ' '.join(
+        word(int(VOCABULARY ** rnd.random()) - 1) for _ in range(count))
+
+
+def seed(posts, seed_value):
+    from django.contrib.auth import get_user_model
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from posts.models import Group, Post
+
+    User = get_user_model()
+    rnd = random.Random(seed_value)
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        insert_rows(cursor, User, (
+            'username', 'password', 'first_name', 'last_name', 'email',
+            'is_superuser', 'is_staff', 'is_active', 'date_joined',
+        ), ((f'user{i}', '', '', '', '', False, False, True, now)
+            for i in range(max(posts // 100, 10))))
+        insert_rows(cursor, Group, ('title', 'slug', 'description'), (
+            (f'group{i}', f'group{i}', '') for i in range(50)))
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        group_ids = list(Group.objects.values_list('pk', flat=True))
+        insert_rows(cursor, Post, (
+            'text', 'pub_date', 'updated', 'author_id', 'group_id', 'image',
+            'comment_count',
+        ), ((words(rnd, rnd.randint(5, 40)), date, date,
+             rnd.choice(user_ids), rnd.choice(group_ids + [None]), '', 0)
+            for date in (
+                now - timedelta(seconds=rnd.randrange(365 * 86400))
+                for _ in range(posts))))
+
+
+def like_search(text):
+    from posts.models import Post
+
+    posts = Post.objects.for_feed()
+    for word in text.split():
+        posts = posts.filter(text__icontains=word)
+    return posts.order_by('-pub_date', '-pk')
+
+
+def report(repeat):
+    from posts.search import search_posts
+
+    queries = {
+        'как союз': word(0),
+        'частое слово': word(10),
+        'обычное слово': word(100),
+        'редкое слово': word(VOCABULARY - 1),
+        'два слова': f'{word(10)} {word(100)}',
+        'нет совпадений': 'missing',
+    }
+    for name, text in queries.items():
+        print(f'\n=== {name}: {text!r} ===')
+        for label, queryset in (
+            ('LIKE', like_search(text)),
+            ('FTS5, по дате', search_posts(text, ranked=False).order_by(
+                '-pub_date', '-pk')),
+            ('FTS5, по релевантности', search_posts(text)),
+        ):
+            page = queryset[:11]
+            elapsed = timed(lambda: list(page.all()), repeat)
+            print(f'{label}: {elapsed:.2f} ms, '
+                  f'найдено на странице {len(page)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    handle, database = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    try:
+        setup_django(database)
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        seed(args.posts, args.seed)
+        call_command('rebuild_search_index', verbosity=0)
+        report(args.repeat)
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
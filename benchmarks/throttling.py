@@ -0,0 +1,116 @@
+"""Цена ограничения частоты на пропущенных и отклонённых запросах.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.throttling --checks 20000
+    python -m benchmarks.throttling --cache-url memcached://127.0.0.1:11211
+
+Для каждого кеша меряется одна проверка core.throttling.allow: каждая
+по общему кешу (аренда 1), с арендой 10 токенов и повторный отказ. Затем
+главная страница из кеша с лимитом и без: так видна добавка к запросу,
+которая сама по себе занимает миллисекунды.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.utils import setup_django
+
+LEASES = (1, 10)
+
+
+def micros_per_check(allow, keys, checks):
+    started = time.perf_counter()
+    for number in range(checks):
+        allow(keys[number % len(keys)])
+    return (time.perf_counter() - started) / checks * 1e6
+
+
+def request_p50(client, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.get('/')
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def worker(args):
+    cache_url, database, checks, repeat = args
+    os.environ['CACHE_URL'] = cache_url
+    setup_django(database)
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.test import Client
+
+    from core import throttling
+
+    settings.DEBUG = False
+    results = {}
+    keys = [f'bench:user:{number}' for number in range(50)]
+    for lease in LEASES:
+        settings.RATE_LIMIT_LEASE = lease
+        throttling.clear()
+        cache.clear()
+        results[f'пропуск, аренда {lease}'] = micros_per_check(
+            lambda key: throttling.allow(key, '1000000/m'), keys, checks)
+    throttling.allow('bench:spammer', '1/d')
+    results['отказ'] = micros_per_check(
+        lambda key: throttling.allow(key, '1/d'), ['bench:spammer'], checks)
+
+    client = Client()
+    client.get('/')
+    settings.RATE_LIMITS = {}
+    results['главная без лимита, мс'] = request_p50(client, repeat)
+    for lease in LEASES:
+        settings.RATE_LIMIT_LEASE = lease
+        settings.RATE_LIMITS = {'post:index': ('1000000/m', {'GET'})}
+        throttling.clear()
+        results[f'главная, аренда {lease}, мс'] = request_p50(client, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument(
+        '--cache-url', action='append', dest='cache_urls',
+        help='адрес кеша, можно несколько; по умолчанию locmem, file и db')
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp()
+    handle, database = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    cache_urls = args.cache_urls or [
+        'locmem://', f'file://{cache_dir}?max_entries=100000',
+        'db://bench_cache?max_entries=100000',
+    ]
+    context = multiprocessing.get_context('spawn')
+    try:
+        os.environ['CACHE_URL'] = 'db://bench_cache'
+        setup_django(database)
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        call_command('createcachetable', verbosity=0)
+        for cache_url in cache_urls:
+            with context.Pool(1) as pool:
+                results = pool.apply(
+                    worker, ((cache_url, database, args.checks,
+                              args.repeat),))
+            print(cache_url.split('?')[0])
+            for name, value in results.items():
+                unit = '' if name.endswith('мс') else ' мкс на проверку'
+                print(f'  {name:<28} {value:>9.3f}{unit}')
+    finally:
+        os.remove(database)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
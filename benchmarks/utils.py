@@ -0,0 +1,43 @@
+import atexit
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(BASE_DIR, 'yatube')
+
+
+def setup_django(database=None):
+    """Настраивает Django из yatube.settings, по желанию на другой базе.
+
+    Медиафайлы пишутся во временный каталог, чтобы не засорять yatube/media.
+    """
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    import django
+    from django.conf import settings
+
+    if database is not None:
+        settings.DATABASES['default']['NAME'] = database
+    settings.MEDIA_ROOT = tempfile.mkdtemp(prefix='yatube-media-')
+    atexit.register(shutil.rmtree, settings.MEDIA_ROOT, True)
+    django.setup()
+
+
+def timed(func, repeat):
+    """Медиана времени вызова func в миллисекундах."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def percentile(samples, share):
+    """Значение, которого не превышает доля share отсортированных samples."""
+    return samples[max(int(len(samples) * share) - 1, 0)]
@@ -0,0 +1,229 @@
+"""Задержка, число запросов и память для основных страниц yatube.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.views --output before.json
+    python -m benchmarks.views --output after.json --compare before.json
+
+Данные готовит benchmarks.data во временной базе (или в --database,
+если файл уже заполнен прошлым запуском с --keep). Каждая страница
+проходит через тестовый клиент Django и через WSGI-приложение напрямую,
+с холодным кешем (перед каждым запросом он очищается) и с тёплым.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime, timezone
+from wsgiref.util import setup_testing_defaults
+
+from benchmarks.data import Scale, generate
+from benchmarks.utils import BASE_DIR, percentile, setup_django
+
+MODES = ('cold', 'warm')
+
+
+class ClientDriver:
+    """Запросы через django.test.Client."""
+
+    def __init__(self, user):
+        from django.test import Client
+
+        self.client = Client()
+        if user is not None:
+            self.client.force_login(user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        return response.content
+
+
+class WSGIDriver(ClientDriver):
+    """Запросы прямо в WSGI-приложение, как от сервера приложений."""
+
+    def __init__(self, user):
+        from django.core.wsgi import get_wsgi_application
+
+        super().__init__(user)
+        self.application = get_wsgi_application()
+        self.cookie = '; '.join(
+            f'{key}={morsel.value}'
+            for key, morsel in self.client.cookies.items())
+
+    def get(self, url):
+        path, _, query = url.partition('?')
+        environ = {
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'HTTP_COOKIE': self.cookie,
+        }
+        setup_testing_defaults(environ)
+        statuses = []
+        result = self.application(
+            environ, lambda status, headers: statuses.append(status))
+        try:
+            content = b''.join(result)
+        finally:
+            result.close()
+        assert statuses[0].startswith('200'), (url, statuses[0])
+        return content
+
+
+DRIVERS = {'client': ClientDriver, 'wsgi': WSGIDriver}
+
+
+def scenarios(dataset):
+    from django.urls import reverse
+
+    return {
+        'index': (reverse('post:index'), None),
+        'index, страница 5': (reverse('post:index') + '?page=5', None),
+        'group_list': (reverse(
+            'post:group_list', args=[dataset.group.slug]), None),
+        'profile, популярный автор': (reverse(
+            'post:profile', args=[dataset.popular_author.username]), None),
+        'profile': (reverse(
+            'post:profile', args=[dataset.author.username]), None),
+        'post_detail': (reverse(
+            'post:post_detail', args=[dataset.post.pk]), None),
+        'follow_index': (reverse('post:follow_index'), dataset.reader),
+        'follow_index, тысячи подписок': (
+            reverse('post:follow_index'), dataset.wide_reader),
+    }
+
+
+def measure(driver, url, mode, repeat):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def request():
+        if mode == 'cold':
+            cache.clear()
+        else:
+            driver.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            driver.get(url)
+            elapsed = (time.perf_counter() - started) * 1000
+        return elapsed, len(queries)
+
+    samples, query_counts = zip(*(request() for _ in range(repeat)))
+    samples = sorted(samples)
+    if mode == 'cold':
+        cache.clear()
+    tracemalloc.start()
+    try:
+        driver.get(url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'p50_ms': round(statistics.median(samples), 3),
+        'p99_ms': round(percentile(samples, 0.99), 3),
+        'queries': max(query_counts),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run(dataset, repeat):
+    results = {}
+    for driver_name, driver_class in DRIVERS.items():
+        for name, (url, user) in scenarios(dataset).items():
+            driver = driver_class(user)
+            for mode in MODES:
+                result = measure(driver, url, mode, repeat)
+                results.setdefault(driver_name, {}).setdefault(
+                    name, {})[mode] = result
+                print(f'{driver_name:<6} {mode:<4} {name:<32} '
+                      f'p50 {result["p50_ms"]:>8.2f} ms  '
+                      f'p99 {result["p99_ms"]:>8.2f} ms  '
+                      f'{result["queries"]:>3} SQL  '
+                      f'{result["peak_kb"]:>8.1f} KiB')
+    return results
+
+
+def compare(results, baseline):
+    print('\nОтносительно', baseline.get('commit', '?'))
+    for driver_name, pages in results.items():
+        for name, modes in pages.items():
+            for mode, result in modes.items():
+                old = baseline['results'].get(driver_name, {}).get(
+                    name, {}).get(mode)
+                if not old:
+                    continue
+                print(f'{driver_name:<6} {mode:<4} {name:<32} '
+                      f'p50 {result["p50_ms"] / old["p50_ms"]:>6.2f}x  '
+                      f'SQL {old["queries"]:>3} -> {result["queries"]:<3}  '
+                      f'память {result["peak_kb"] / old["peak_kb"]:.2f}x')
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='множитель объёма данных из benchmarks.data')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database', help='файл SQLite для данных')
+    parser.add_argument('--keep', action='store_true',
+                        help='не удалять базу после запуска')
+    parser.add_argument('--output', default='benchmark-views.json')
+    parser.add_argument('--compare', help='JSON прошлого запуска')
+    args = parser.parse_args()
+
+    database = args.database
+    if database is None:
+        handle, database = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+    reuse = os.path.exists(database) and os.path.getsize(database) > 0
+    scale = Scale().scaled(args.scale)
+    try:
+        setup_django(database)
+        from django.conf import settings
+        from django.core.management import call_command
+
+        # Без DEBUG Django не копит запросы в connection.queries и
+        # кеширует шаблоны, как в рабочем окружении.
+        settings.DEBUG = False
+        call_command('migrate', verbosity=0)
+        started = time.perf_counter()
+        dataset = generate(scale, args.seed, reuse=reuse)
+        print(f'Данные готовы за {time.perf_counter() - started:.1f} с\n')
+        results = run(dataset, args.repeat)
+    finally:
+        if not args.keep:
+            os.remove(database)
+
+    report = {
+        'commit': current_commit(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'scale': asdict(scale),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
+    print(f'\nРезультаты записаны в {args.output}')
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    # Фикстуры вроде mock_media удаляют MEDIA_ROOT раньше, чем закрываются
+    # автоматические фикстуры, поэтому превью дожидаются сразу после теста.
+    yield
+    from posts import thumbnails
+
+    thumbnails.drain()
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .throttling import check_cache
+
+        checks.register(check_cache, checks.Tags.caches)
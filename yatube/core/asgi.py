@@ -0,0 +1,141 @@
+"""ASGI-обёртка над WSGI-приложением Django 2.2.
+
+Своего ASGI-обработчика и асинхронных представлений в Django 2.2 нет,
+а ORM привязан к потоку. Поэтому представления работают как раньше, в
+пуле из ASGI_THREADS потоков, а всё общение с клиентом идёт в цикле
+событий сервера: поток занят, только пока Django готовит ответ, а не
+пока медленный клиент досылает тело запроса или забирает ответ.
+
+Для этого ответ собирается в потоке целиком, большой — во временный
+файл, и только потом отдаётся из цикла. Потоковые ответы, например
+выгрузка постов, тоже собираются целиком: клиент получит первый байт,
+когда выгрузка будет готова.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Размер куска тела ответа, отправляемого клиенту за раз.
+CHUNK_SIZE = 64 * 1024
+
+
+class WsgiToAsgi:
+    """ASGI 3 приложение поверх WSGI-приложения."""
+
+    def __init__(self, wsgi_application, threads, spool_size):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='asgi')
+        self.spool_size = spool_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        # Большие тела, например картинки, уходят во временный файл.
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        loop = asyncio.get_running_loop()
+        try:
+            status, headers, content = await loop.run_in_executor(
+                self.executor, self.respond, environ(scope, body))
+        finally:
+            body.close()
+        try:
+            await send({'type': 'http.response.start', 'status': status,
+                        'headers': headers})
+            while True:
+                chunk = content.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk,
+                            'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            content.close()
+
+    def respond(self, environ):
+        """Выполняется в потоке пула: статус, заголовки и файл с телом."""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+            return content.write
+
+        content = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        try:
+            result = self.wsgi_application(environ, start_response)
+            try:
+                for chunk in result:
+                    content.write(chunk)
+            finally:
+                # Django закрывает соединения с базой по request_finished,
+                # то есть в том же потоке, где шёл запрос.
+                if hasattr(result, 'close'):
+                    result.close()
+        except BaseException:
+            content.close()
+            raise
+        content.seek(0)
+        return started['status'], started['headers'], content
+
+
+def environ(scope, body):
+    """WSGI environ по ASGI scope."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
@@ -0,0 +1,260 @@
+"""Замеры запросов: SQL, шаблоны, кеш и превью по каждому представлению.
+
+Замер включается для доли запросов INSTRUMENTATION_SAMPLE_RATE. Пока он
+не идёт, обёртки над шаблонами и кешем только проверяют, есть ли у
+потока текущий замер. Гистограммы хранятся в памяти процесса и
+охватывают последние INSTRUMENTATION_WINDOW минут.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.base import Template
+
+# Верхние границы корзин гистограммы в миллисекундах.
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_state = threading.local()
+_lock = threading.Lock()
+_installed = set()
+_MISSING = object()
+
+
+class RequestStats:
+    """Счётчики одного запроса: имя замера -> [количество, секунды]."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.metrics = defaultdict(lambda: [0, 0.0])
+
+    def add(self, name, duration=0.0, count=1):
+        metric = self.metrics[name]
+        metric[0] += count
+        metric[1] += duration
+
+    def count(self, name):
+        return self.metrics[name][0] if name in self.metrics else 0
+
+    def duration(self, name):
+        return self.metrics[name][1] if name in self.metrics else 0.0
+
+    def server_timing(self, total):
+        """Значение заголовка Server-Timing."""
+        parts = [f'total;dur={total * 1000:.1f}']
+        if 'sql' in self.metrics:
+            parts.append(
+                f'sql;dur={self.duration("sql") * 1000:.1f};'
+                f'desc="{self.count("sql")} queries"')
+        if 'template' in self.metrics:
+            parts.append(
+                f'template;dur={self.duration("template") * 1000:.1f}')
+        if 'cache_hit' in self.metrics or 'cache_miss' in self.metrics:
+            parts.append(
+                f'cache;desc="hit={self.count("cache_hit")} '
+                f'miss={self.count("cache_miss")}"')
+        thumbnails = sorted(
+            name for name in self.metrics if name.startswith('thumbnail_'))
+        if thumbnails:
+            parts.append('thumbnails;desc="{}"'.format(' '.join(
+                f'{name[len("thumbnail_"):]}={self.count(name)}'
+                for name in thumbnails)))
+        return ', '.join(parts)
+
+
+def current():
+    return getattr(_state, 'stats', None)
+
+
+def record(name, duration=0.0, count=1):
+    """Добавляет замер к текущему запросу, если он измеряется."""
+    stats = current()
+    if stats is not None:
+        stats.add(name, duration, count)
+
+
+@contextmanager
+def timer(name):
+    stats = current()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add(name, time.perf_counter() - started)
+
+
+@contextmanager
+def measuring():
+    """Собирает RequestStats для кода внутри блока."""
+    stats = _state.stats = RequestStats()
+    try:
+        yield stats
+    finally:
+        _state.stats = None
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record('sql', time.perf_counter() - started)
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.requests = 0
+        self.total = 0.0
+        self.metrics = defaultdict(lambda: [0, 0.0])
+
+    def add(self, elapsed, stats):
+        self.buckets[bisect_left(BUCKETS, elapsed * 1000)] += 1
+        self.requests += 1
+        self.total += elapsed
+        for name, (count, duration) in stats.metrics.items():
+            metric = self.metrics[name]
+            metric[0] += count
+            metric[1] += duration
+
+    def merge(self, other):
+        for index, count in enumerate(other.buckets):
+            self.buckets[index] += count
+        self.requests += other.requests
+        self.total += other.total
+        for name, (count, duration) in other.metrics.items():
+            metric = self.metrics[name]
+            metric[0] += count
+            metric[1] += duration
+
+    def percentile(self, share):
+        """Верхняя граница корзины, в которую попал перцентиль share."""
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= self.requests * share:
+                return BUCKETS[index] if index < len(BUCKETS) else None
+        return None
+
+    def summary(self):
+        requests = self.requests or 1
+        return {
+            'requests': self.requests,
+            'mean_ms': round(self.total / requests * 1000, 2),
+            'p50_ms': self.percentile(0.5),
+            'p90_ms': self.percentile(0.9),
+            'p99_ms': self.percentile(0.99),
+            'metrics': {
+                name: {
+                    'per_request': round(count / requests, 2),
+                    'mean_ms': round(duration / requests * 1000, 2),
+                }
+                for name, (count, duration) in sorted(self.metrics.items())
+            },
+            'buckets': {
+                f'le_{bound}ms' if bound else 'inf': count
+                for bound, count in zip(BUCKETS + (None,), self.buckets)
+            },
+        }
+
+
+class Registry:
+    """Поминутные гистограммы представлений за скользящее окно."""
+
+    def __init__(self):
+        self.minutes = defaultdict(dict)
+
+    def add(self, view_name, elapsed, stats):
+        minute = int(time.time() // 60)
+        with _lock:
+            histograms = self.minutes[view_name]
+            if minute not in histograms:
+                histograms[minute] = Histogram()
+                for old in [m for m in histograms
+                            if m <= minute - settings.INSTRUMENTATION_WINDOW]:
+                    del histograms[old]
+            histograms[minute].add(elapsed, stats)
+
+    def snapshot(self):
+        oldest = time.time() // 60 - settings.INSTRUMENTATION_WINDOW
+        result = {}
+        with _lock:
+            for view_name, histograms in self.minutes.items():
+                total = Histogram()
+                for minute, histogram in histograms.items():
+                    if minute > oldest:
+                        total.merge(histogram)
+                if total.requests:
+                    result[view_name] = total.summary()
+        return result
+
+    def clear(self):
+        with _lock:
+            self.minutes.clear()
+
+
+registry = Registry()
+
+
+def _instrument_render(render):
+    def wrapper(self, context):
+        # Вложенные шаблоны ({% include %}, {% extends %}) рендерятся
+        # внутри внешнего и уже входят в его время.
+        if context.template is not None or current() is None:
+            return render(self, context)
+        with timer('template'):
+            return render(self, context)
+    return wrapper
+
+
+def _instrument_cache(method, count_hits):
+    # Бэкенды вызывают get и get_many друг через друга: считается только
+    # внешний вызов.
+    def wrapper(self, *args, **kwargs):
+        if current() is None or getattr(_state, 'in_cache', False):
+            return method(self, *args, **kwargs)
+        _state.in_cache = True
+        try:
+            return count_hits(method, self, *args, **kwargs)
+        finally:
+            _state.in_cache = False
+    return wrapper
+
+
+def _count_get(get, cache, key, default=None, version=None):
+    value = get(cache, key, _MISSING, version)
+    if value is _MISSING:
+        record('cache_miss')
+        return default
+    record('cache_hit')
+    return value
+
+
+def _count_get_many(get_many, cache, keys, version=None):
+    keys = list(keys)
+    found = get_many(cache, keys, version)
+    record('cache_hit', count=len(found))
+    record('cache_miss', count=len(keys) - len(found))
+    return found
+
+
+def install():
+    """Оборачивает рендер шаблонов и чтение из кешей из CACHES."""
+    with _lock:
+        if Template not in _installed:
+            Template.render = _instrument_render(Template.render)
+            _installed.add(Template)
+        for alias in settings.CACHES:
+            backend = type(caches[alias])
+            if backend in _installed:
+                continue
+            backend.get = _instrument_cache(backend.get, _count_get)
+            backend.get_many = _instrument_cache(
+                backend.get_many, _count_get_many)
+            _installed.add(backend)
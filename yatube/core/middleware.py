@@ -0,0 +1,98 @@
+import math
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+from . import instrumentation, routers, throttling
+
+PIN_COOKIE = 'primary_pin'
+
+
+class InstrumentationMiddleware:
+    """Замеряет запросы и отдаёт результат в заголовке Server-Timing.
+
+    Стоит первым в MIDDLEWARE, чтобы в общее время вошли все остальные
+    middleware. Измеряется доля запросов INSTRUMENTATION_SAMPLE_RATE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrumentation.install()
+
+    def __call__(self, request):
+        rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        with ExitStack() as stack:
+            stats = stack.enter_context(instrumentation.measuring())
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(
+                    instrumentation.sql_wrapper))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - stats.started
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+        instrumentation.registry.add(view_name, elapsed, stats)
+        response['Server-Timing'] = stats.server_timing(elapsed)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Закрепляет чтение за основной базой после записи, см. core.routers.
+
+    Стоит до SessionMiddleware, чтобы запись сессии тоже считалась.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset(pinned=PIN_COOKIE in request.COOKIES)
+        response = self.get_response(request)
+        if settings.DATABASE_REPLICAS and routers.wrote():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.DATABASE_PIN_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
+
+
+class ThrottleMiddleware:
+    """Отвечает 429, если пользователь исчерпал лимит представления.
+
+    Лимиты задаются в RATE_LIMITS по имени представления и по умолчанию
+    берутся только с изменяющих запросов, см. core.throttling; гость
+    считается по адресу. Стоит после
+    AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name
+        limit = settings.RATE_LIMITS.get(view_name)
+        if limit is None:
+            return None
+        rate, methods = throttling.parse_limit(limit)
+        if request.method not in methods:
+            return None
+        if request.user.is_authenticated:
+            who = f'user:{request.user.pk}'
+        else:
+            who = f'ip:{request.META.get("REMOTE_ADDR", "")}'
+        allowed, retry_after = throttling.allow(f'{view_name}:{who}', rate)
+        if allowed:
+            return None
+        retry_after = max(math.ceil(retry_after), 1)
+        response = HttpResponse(
+            f'Слишком много запросов, повторите через {retry_after} с.',
+            status=429, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = retry_after
+        return response
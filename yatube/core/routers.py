@@ -0,0 +1,55 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики — псевдонимы из DATABASE_REPLICAS. Поток, который что-то
+записал, дальше до конца запроса читает из основной базы, а
+ReplicaPinMiddleware продлевает это на DATABASE_PIN_SECONDS через
+cookie: пока реплики догоняют, автор видит свои изменения.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Таблица бэкенда кеша db:// должна читаться оттуда же, куда пишется.
+PRIMARY_ONLY_APPS = {'django_cache'}
+
+_state = threading.local()
+
+
+def pin(wrote=False):
+    """Направляет чтение текущего потока в основную базу."""
+    _state.pinned = True
+    _state.wrote = getattr(_state, 'wrote', False) or wrote
+
+
+def reset(pinned=False):
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Внутри транзакции чтение должно видеть её же записи.
+        if (not settings.DATABASE_REPLICAS or pinned()
+                or model._meta.app_label in PRIMARY_ONLY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS:
+            pin(wrote=True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        return True
@@ -0,0 +1,30 @@
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    """Прагмы SQLite из DATABASES[...]['PRAGMAS'], см. yatube.env."""
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """Закрывает оборванные постоянные соединения до начала запроса.
+
+    Замена CONN_HEALTH_CHECKS из новых Django: без неё запрос, которому
+    досталось соединение, закрытое базой или пулом, падает с ошибкой.
+    Django 2.2 проверяет соединение, только если в нём уже была ошибка.
+    """
+    for connection in connections.all():
+        if (connection.settings_dict.get('CONN_HEALTH_CHECKS')
+                and connection.connection is not None
+                and not connection.is_usable()):
+            connection.close()
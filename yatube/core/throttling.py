@@ -0,0 +1,152 @@
+"""Ограничение частоты запросов: корзина токенов на пользователя.
+
+RATE_LIMITS связывает имя представления с лимитом вида '10/m': корзина
+на 10 токенов, которая наполняется за минуту. Такой лимит списывается
+только с изменяющих запросов (POST, PUT, PATCH, DELETE), и открытие
+формы не тратит попытку её отправить; методы задаются явно парой
+('30/m', {'GET'}), например для подписки по ссылке. Корзина лежит в
+общем кеше двумя ключами, временем начала и числом потраченных токенов,
+и меняется только через add и incr. Атомарны они лишь в memcached и
+redis: в file:// и db:// incr — это чтение и запись, параллельные
+процессы затирают списания друг друга и пропускают лишние запросы.
+Поэтому на таких кешах check_cache предупреждает, что лимиты неточны.
+
+Чтобы не ходить в кеш на каждый запрос, процесс берёт из корзины сразу
+RATE_LIMIT_LEASE токенов и тратит их сам, а остаток возвращает при
+следующей сверке, не позже чем через RATE_LIMIT_LEASE_SECONDS. Отказ
+процесс помнит до Retry-After и повторяет его без кеша.
+"""
+import math
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.core.exceptions import ImproperlyConfigured
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+UNSAFE_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+# Сколько локальных аренд держать, прежде чем выбросить истёкшие.
+MAX_LEASES = 10000
+# Бэкенды, в которых incr не атомарен между процессами.
+NON_ATOMIC_BACKENDS = {
+    'django.core.cache.backends.filebased.FileBasedCache',
+    'django.core.cache.backends.db.DatabaseCache',
+}
+
+_lock = threading.Lock()
+_leases = {}
+
+
+class Lease:
+    __slots__ = ('tokens', 'expires', 'denied_until')
+
+    def __init__(self, tokens=0, expires=0.0, denied_until=0.0):
+        self.tokens = tokens
+        self.expires = expires
+        self.denied_until = denied_until
+
+
+@lru_cache(maxsize=None)
+def parse_rate(value):
+    """'10/m' -> (10, 60): размер корзины и время её наполнения."""
+    try:
+        burst, period = value.split('/')
+        return int(burst), PERIODS[period]
+    except (KeyError, ValueError):
+        raise ImproperlyConfigured(f'Неверный лимит: {value!r}')
+
+
+def parse_limit(value):
+    """'10/m' или ('10/m', {'GET'}) -> лимит и методы, с которых он берётся."""
+    if isinstance(value, str):
+        return value, UNSAFE_METHODS
+    rate, methods = value
+    return rate, frozenset(method.upper() for method in methods)
+
+
+def check_cache(app_configs, **kwargs):
+    """Предупреждает, если лимиты лежат в кеше без атомарного incr."""
+    backend = settings.CACHES[DEFAULT_CACHE_ALIAS]['BACKEND']
+    if not settings.RATE_LIMITS or backend not in NON_ATOMIC_BACKENDS:
+        return []
+    return [checks.Warning(
+        f'В {backend} incr не атомарен: при нескольких процессах '
+        'RATE_LIMITS пропустят больше запросов, чем задано.',
+        hint='Для точных лимитов нужен memcached:// или redis://.',
+        id='core.W001',
+    )]
+
+
+def take(key, rate, count, returned=0, now=None):
+    """Берёт до count токенов из общей корзины, вернув в неё returned.
+
+    Возвращает число выданных токенов и сколько секунд ждать следующего.
+    """
+    now = time.time() if now is None else now
+    burst, period = parse_rate(rate)
+    per_second = burst / period
+    start_key, spent_key = f'throttle:{key}:start', f'throttle:{key}:spent'
+    # Время начала живёт дольше счётчика: иначе счётчик без начала
+    # запретил бы запросы надолго.
+    start = cache.get_or_set(start_key, now, period * 2)
+    cache.add(spent_key, 0, period)
+    try:
+        spent = cache.incr(spent_key, count - returned)
+    except ValueError:
+        spent = count - returned
+        cache.set(spent_key, spent, period)
+    allowance = burst + per_second * (now - start)
+    # Корзина не бывает полнее burst: накопленное за простой сгорает.
+    surplus = int(allowance - (spent - count) - burst)
+    if surplus > 0:
+        spent = cache.incr(spent_key, surplus)
+    granted = min(count, max(0, math.floor(allowance - (spent - count))))
+    if granted < count:
+        spent = cache.incr(spent_key, granted - count)
+    cache.touch(start_key, period * 2)
+    cache.touch(spent_key, period)
+    return granted, max(0.0, (spent + 1 - allowance) / per_second)
+
+
+def allow(key, rate, now=None):
+    """Пропускает запрос или возвращает, через сколько секунд повторить."""
+    now = time.time() if now is None else now
+    with _lock:
+        lease = _leases.get(key)
+        if lease is not None:
+            if lease.denied_until > now:
+                return False, lease.denied_until - now
+            if lease.tokens and lease.expires > now:
+                lease.tokens -= 1
+                return True, 0.0
+            # Остаток вернёт тот, кто сверяется, и только один раз.
+            del _leases[key]
+    returned = lease.tokens if lease is not None else 0
+    want = max(1, min(settings.RATE_LIMIT_LEASE, parse_rate(rate)[0]))
+    granted, retry_after = take(key, rate, want, returned, now)
+    with _lock:
+        if len(_leases) >= MAX_LEASES:
+            _forget_expired(now)
+        if not granted:
+            _leases[key] = Lease(denied_until=now + retry_after)
+            return False, retry_after
+        _leases[key] = Lease(
+            tokens=granted - 1,
+            expires=now + settings.RATE_LIMIT_LEASE_SECONDS)
+        return True, 0.0
+
+
+def clear():
+    """Забывает аренды и отказы процесса, например после смены лимитов."""
+    with _lock:
+        _leases.clear()
+
+
+def _forget_expired(now):
+    # Невозвращённые токены истёкших аренд вернёт наполнение корзины.
+    for key, lease in list(_leases.items()):
+        if lease.expires <= now and lease.denied_until <= now:
+            del _leases[key]
@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from .instrumentation import registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +20,13 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def instrumentation_report(request):
+    """Гистограммы представлений этого процесса за последние минуты."""
+    return JsonResponse({
+        'sample_rate': settings.INSTRUMENTATION_SAMPLE_RATE,
+        'window_minutes': settings.INSTRUMENTATION_WINDOW,
+        'views': registry.snapshot(),
+    }, json_dumps_params={'ensure_ascii': False, 'indent': 2})
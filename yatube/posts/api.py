@@ -0,0 +1,215 @@
+"""JSON API только для чтения: ленты, пост и комментарии.
+
+Записи выбираются через values(), без создания объектов моделей, теми
+же запросами и курсорами, что и HTML-страницы. Параметр ?fields=id,text
+оставляет в ответе только перечисленные поля и только их выбирает из
+базы. Ответ сжимается brotli, если пакет brotli установлен и клиент его
+принимает, иначе gzip.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_GET
+
+from .caching import cache_feed
+from .feed import FollowFeedPaginator
+from .graph import is_following
+from .models import Comment, Group, Post, User
+from .utils import get_comments_page, get_page_obj
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def iso(value):
+    return value.isoformat() if value else None
+
+
+def media_url(name):
+    return settings.MEDIA_URL + name if name else None
+
+
+class Serializer:
+    """Поля ответа: имя -> (поле для values(), преобразование или None).
+
+    key — поля, которые нужны пагинатору для курсора, даже если их нет
+    среди запрошенных.
+    """
+
+    def __init__(self, key, **fields):
+        self.key = key
+        self.fields = fields
+
+    def select(self, request):
+        """Имена полей из ?fields= или все поля."""
+        names = [name for name in request.GET.get('fields', '').split(',')
+                 if name]
+        if not names:
+            return list(self.fields)
+        unknown = set(names) - self.fields.keys()
+        if unknown:
+            raise BadRequest(
+                'Неизвестные поля: {}'.format(', '.join(sorted(unknown))))
+        return names
+
+    def columns(self, names):
+        return {self.fields[name][0] for name in names} | set(self.key)
+
+    def dump(self, rows, names):
+        fields = [(name, *self.fields[name]) for name in names]
+        return [
+            {name: convert(row[column]) if convert else row[column]
+             for name, column, convert in fields}
+            for row in rows
+        ]
+
+
+POST = Serializer(
+    ('id', 'pub_date'),
+    id=('id', None),
+    text=('text', None),
+    pub_date=('pub_date', iso),
+    author=('author__username', None),
+    group=('group__slug', None),
+    image=('image', media_url),
+    comment_count=('comment_count', None),
+)
+COMMENT = Serializer(
+    ('id', 'created'),
+    id=('id', None),
+    post=('post_id', None),
+    author=('author__username', None),
+    text=('text', None),
+    created=('created', iso),
+)
+
+
+def compress(request, response):
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if (brotli is None or 'br' not in accepted
+            or len(response.content) < 200
+            or response.has_header('Content-Encoding')):
+        return GZipMiddleware().process_response(request, response)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response.content = brotli.compress(response.content)
+    response['Content-Length'] = str(len(response.content))
+    response['Content-Encoding'] = 'br'
+    return response
+
+
+def api_view(view):
+    """Ошибки в виде JSON и сжатие ответа."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            response = view(request, *args, **kwargs)
+        except BadRequest as error:
+            response = JsonResponse({'detail': str(error)}, status=400)
+        except Http404:
+            response = JsonResponse({'detail': 'Не найдено.'}, status=404)
+        return compress(request, response)
+    return wrapper
+
+
+def page_response(request, page, serializer, names, **extra):
+    paginator = page.paginator
+    return JsonResponse({
+        **extra,
+        'results': serializer.dump(page, names),
+        'next': (f'{request.path}?{paginator.next_query}'
+                 if page.has_next() else None),
+        'previous': (f'{request.path}?{paginator.previous_query}'
+                     if page.has_previous() else None),
+    }, json_dumps_params=JSON_PARAMS)
+
+
+def post_page(request, posts, **extra):
+    names = POST.select(request)
+    page = get_page_obj(request, posts.values(*POST.columns(names)))
+    return page_response(request, page, POST, names, **extra)
+
+
+@cache_feed('api_index')
+@api_view
+def index(request):
+    return post_page(request, Post.objects.all())
+
+
+@cache_feed('api_group')
+@api_view
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).values(
+        'id', 'slug', 'title', 'description').first()
+    if group is None:
+        raise Http404
+    return post_page(
+        request, Post.objects.filter(group_id=group.pop('id')), group=group)
+
+
+@cache_feed('api_profile')
+@api_view
+def profile(request, username):
+    author = User.objects.filter(username=username).values(
+        'id', 'username', 'first_name', 'last_name',
+        'stats__posts', 'stats__followers', 'stats__following').first()
+    if author is None:
+        raise Http404
+    author_id = author.pop('id')
+    return post_page(
+        request, Post.objects.filter(author_id=author_id),
+        author={
+            'username': author['username'],
+            'first_name': author['first_name'],
+            'last_name': author['last_name'],
+            'posts': author['stats__posts'] or 0,
+            'followers': author['stats__followers'] or 0,
+            'following': author['stats__following'] or 0,
+            'is_following': is_following(request.user.pk, author_id),
+        })
+
+
+@cache_feed('api_follow')
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Нужно войти.'}, status=401,
+            json_dumps_params=JSON_PARAMS)
+    names = POST.select(request)
+    page = get_page_obj(
+        request, Post.objects.values(*POST.columns(names)),
+        FollowFeedPaginator, user=request.user)
+    return page_response(request, page, POST, names)
+
+
+@api_view
+def post_detail(request, post_id):
+    names = POST.select(request)
+    post = Post.objects.filter(pk=post_id).values(
+        *POST.columns(names)).first()
+    if post is None:
+        raise Http404
+    return JsonResponse(
+        POST.dump([post], names)[0], json_dumps_params=JSON_PARAMS)
+
+
+@api_view
+def comments(request, post_id):
+    names = COMMENT.select(request)
+    page = get_comments_page(request, Comment.objects.filter(
+        post_id=post_id).values(*COMMENT.columns(names)))
+    if not page and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return page_response(request, page, COMMENT, names)
@@ -0,0 +1,148 @@
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from core import routers
+
+from .counters import user_stats
+from .models import Comment, Post
+
+GENERATION_KEY = 'posts:generation'
+CHANGED_KEY = 'posts:changed'
+
+
+def get_generation():
+    """Текущее поколение данных, на котором построены ключи кеша лент."""
+    # Начальное значение берётся из времени, чтобы после вытеснения ключа
+    # номер не вернулся к уже использованному и не оживил старые страницы.
+    return cache.get_or_set(
+        GENERATION_KEY, lambda: int(time.time() * 1000), None)
+
+
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        get_generation()
+    cache.set(CHANGED_KEY, time.time(), None)
+
+
+def invalidate_feeds():
+    """Сбрасывает закешированные ленты сразу и после фиксации транзакции.
+
+    Повторный сброс после фиксации не даёт параллельному запросу
+    закешировать ещё не зафиксированное состояние под новым поколением.
+    """
+    bump_generation()
+    transaction.on_commit(bump_generation)
+
+
+def feed_etag(request, *args, **kwargs):
+    return f'{get_generation()}-{request.user.pk or 0}'
+
+
+def feed_last_modified(request, *args, **kwargs):
+    """Время последнего изменения данных, за которым следят ленты."""
+    # Если ключ вытеснен, безопасно считать, что всё изменилось сейчас.
+    changed = cache.get_or_set(CHANGED_KEY, time.time, None)
+    return datetime.fromtimestamp(changed, timezone.utc)
+
+
+def revalidated(etag_func, last_modified_func):
+    """condition() и запрет отдавать страницу из кеша без перепроверки."""
+    def decorator(view):
+        @condition(etag_func=etag_func, last_modified_func=last_modified_func)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            patch_cache_control(response, max_age=0, must_revalidate=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def detail_post(request, post_id):
+    """Пост для post_detail вместе со временем последнего комментария.
+
+    Запоминается в запросе: по нему condition() считает ETag и
+    Last-Modified, а потом его же показывает представление.
+    """
+    posts = request.__dict__.setdefault('_detail_posts', {})
+    if post_id not in posts:
+        last_comment = Comment.objects.filter(
+            post=OuterRef('pk')).order_by('-created').values('created')[:1]
+        posts[post_id] = Post.objects.select_related(
+            'author__stats', 'group',
+        ).annotate(
+            last_comment=Subquery(last_comment),
+        ).filter(pk=post_id).first()
+    return posts[post_id]
+
+
+def post_etag(request, post_id):
+    post = detail_post(request, post_id)
+    if post is None:
+        return None
+    return '{}-{}-{}-{}-{}-{}'.format(
+        post.pk, post.updated.timestamp(),
+        post.last_comment.timestamp() if post.last_comment else 0,
+        post.comment_count, user_stats(post.author).posts,
+        request.user.pk or 0)
+
+
+def post_last_modified(request, post_id):
+    post = detail_post(request, post_id)
+    if post is None:
+        return None
+    return max(post.updated, post.last_comment or post.updated)
+
+
+def replica_may_lag(request):
+    """Страницу строит реплика, которая может не знать о свежем изменении.
+
+    Такую страницу нельзя класть в кеш: она осталась бы под ключом
+    нового поколения до следующего изменения.
+    """
+    if not settings.DATABASE_REPLICAS or routers.pinned():
+        return False
+    changed = feed_last_modified(request).timestamp()
+    return changed > time.time() - settings.DATABASE_PIN_SECONDS
+
+
+def cache_feed(key_prefix, timeout=None):
+    """Кеширует ленту под ключом текущего поколения и отдаёт его как ETag.
+
+    Last-Modified — время последнего изменения данных, для клиентов,
+    которые присылают только If-Modified-Since.
+
+    Страница живёт в кеше, пока не изменятся посты, комментарии, группы
+    или подписки, поэтому браузеру разрешено только перепроверять её.
+    """
+    if timeout is None:
+        timeout = settings.FEED_CACHE_TIMEOUT
+
+    def decorator(view):
+        @condition(etag_func=feed_etag, last_modified_func=feed_last_modified)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if replica_may_lag(request):
+                response = view(request, *args, **kwargs)
+            else:
+                # Страница зависит от пользователя (шапка, кнопка подписки),
+                # а Vary: Cookie появляется уже после декоратора.
+                prefix = f'{key_prefix}:{feed_etag(request)}'
+                response = cache_page(timeout, key_prefix=prefix)(view)(
+                    request, *args, **kwargs)
+            patch_cache_control(response, max_age=0, must_revalidate=True)
+            del response['Expires']
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,171 @@
+"""Буфер записи комментариев для всплесков на популярных постах.
+
+Включается COMMENT_BUFFER_DELAY > 0. add_comment проверяет форму сразу,
+а комментарий ставит в очередь процесса. Фоновый поток вставляет её
+одним bulk_create не позже чем через COMMENT_BUFFER_DELAY секунд после
+первого комментария в очереди или как только их наберётся
+COMMENT_BUFFER_BATCH. Пока комментарий ждёт, автор видит его из кеша
+под своим ключом: сессия в базе сама стала бы записью на каждый запрос.
+
+Очередь живёт в памяти процесса: при аварийной остановке теряются
+комментарии последних COMMENT_BUFFER_DELAY секунд.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+
+from . import counters
+from .caching import invalidate_feeds
+from .models import Comment, Post
+from .utils import chunked
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд сверх COMMENT_BUFFER_DELAY автор видит свой комментарий
+# из кеша, если запись в базу почему-то задержалась.
+OVERLAY_GRACE = 10
+
+_ready = threading.Condition()
+_queue = []
+_flusher = None
+
+
+def enabled():
+    return settings.COMMENT_BUFFER_DELAY > 0
+
+
+def submit(request, post_id, text):
+    """Ставит проверенный комментарий в очередь и запоминает для автора."""
+    with _ready:
+        _queue.append(
+            Comment(post_id=post_id, author_id=request.user.pk, text=text))
+        _start_flusher()
+        if len(_queue) >= settings.COMMENT_BUFFER_BATCH:
+            _ready.notify()
+    entries = [entry for entry in _pending(request.user.pk)
+               if not _expired(entry)]
+    entries.append({'post': post_id, 'text': text, 'queued': time.time()})
+    _remember(request.user.pk, entries)
+
+
+def flush():
+    """Записывает очередь сейчас, не дожидаясь фонового потока."""
+    with _ready:
+        batch = _queue[:]
+        _queue.clear()
+    if batch:
+        write(batch)
+
+
+def write(batch):
+    """Вставляет комментарии и обновляет то, что делают их сигналы."""
+    with transaction.atomic():
+        # Транзакция начинается с записи: в SQLite транзакция, которая
+        # сначала читает, не может дождаться блокировки на запись и сразу
+        # падает с «database is locked». Счётчик удалённого поста
+        # обновлять просто некому.
+        counters.bump_many(Post, 'comment_count', Counter(
+            comment.post_id for comment in batch))
+        # Пост могли удалить, пока комментарий ждал в очереди.
+        alive = set()
+        for chunk in chunked({comment.post_id for comment in batch}):
+            alive.update(Post.objects.filter(
+                pk__in=chunk).values_list('pk', flat=True))
+        Comment.objects.bulk_create(
+            comment for comment in batch if comment.post_id in alive)
+        invalidate_feeds()
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is None or not _flusher.is_alive():
+        _flusher = threading.Thread(
+            target=_flush_forever, name='comment-buffer', daemon=True)
+        _flusher.start()
+
+
+def _flush_forever():
+    while True:
+        with _ready:
+            _ready.wait_for(lambda: _queue)
+            _ready.wait_for(
+                lambda: len(_queue) >= settings.COMMENT_BUFFER_BATCH,
+                timeout=settings.COMMENT_BUFFER_DELAY)
+            batch = _queue[:]
+            _queue.clear()
+        if not batch:
+            continue
+        try:
+            write(batch)
+        except Exception:
+            logger.exception('Не удалось записать %d комментариев',
+                             len(batch))
+        finally:
+            close_old_connections()
+
+
+atexit.register(flush)
+
+
+def _pending_key(user_id):
+    return f'comment-buffer:pending:{user_id}'
+
+
+def _pending(user_id):
+    return cache.get(_pending_key(user_id)) or []
+
+
+def _remember(user_id, entries):
+    if entries:
+        cache.set(_pending_key(user_id), entries,
+                  settings.COMMENT_BUFFER_DELAY + OVERLAY_GRACE)
+    else:
+        cache.delete(_pending_key(user_id))
+
+
+def _expired(entry):
+    return entry['queued'] < (
+        time.time() - settings.COMMENT_BUFFER_DELAY - OVERLAY_GRACE)
+
+
+def pending_count(request, post_id):
+    """Сколько комментариев автора к посту ещё может ждать в очереди."""
+    if not enabled() or not request.user.is_authenticated:
+        return 0
+    return sum(entry['post'] == post_id
+               for entry in _pending(request.user.pk))
+
+
+def pending_comments(request, post_id):
+    """Комментарии автора к посту, которых ещё нет в базе."""
+    if not pending_count(request, post_id):
+        return []
+    entries = [entry for entry in _pending(request.user.pk)
+               if not _expired(entry)]
+    ours = [entry for entry in entries if entry['post'] == post_id]
+    if ours:
+        # Вставленный комментарий получает время вставки, то есть не
+        # раньше, чем встал в очередь.
+        written = Counter(Comment.objects.filter(
+            post_id=post_id, author_id=request.user.pk,
+            created__gte=datetime.fromtimestamp(
+                min(entry['queued'] for entry in ours), timezone.utc),
+        ).values_list('text', flat=True))
+        for entry in ours[:]:
+            if written[entry['text']]:
+                written[entry['text']] -= 1
+                ours.remove(entry)
+                entries.remove(entry)
+    _remember(request.user.pk, entries)
+    return [
+        {'author': request.user, 'text': entry['text'],
+         'created': datetime.fromtimestamp(entry['queued'], timezone.utc)}
+        for entry in ours
+    ]
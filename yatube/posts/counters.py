@@ -0,0 +1,109 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+from .utils import chunked
+
+
+def count_of(model, field):
+    """Подзапрос с числом строк model, ссылающихся на внешнюю запись."""
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(Subquery(
+        rows.values(field).annotate(total=Count('pk')).values('total')), 0)
+
+
+def shifted(field, delta):
+    """F(field) + delta; уменьшение не опускает счётчик ниже нуля.
+
+    Счётчик мог разойтись с записями до reconcile_counters, а отрицательное
+    значение не пропустит проверка PositiveIntegerField в базе.
+    """
+    if delta >= 0:
+        return F(field) + delta
+    return Greatest(F(field) + delta, 0)
+
+
+def bump_user(user_id, **deltas):
+    """Атомарно сдвигает счётчики пользователя на переданные величины.
+
+    Строка счётчиков создаётся только при увеличении: уменьшение
+    приходит и при каскадном удалении самого пользователя.
+    """
+    changes = {name: shifted(name, delta) for name, delta in deltas.items()}
+    with transaction.atomic():
+        if UserStats.objects.filter(user_id=user_id).update(**changes):
+            return
+        if any(delta < 0 for delta in deltas.values()):
+            return
+        UserStats.objects.get_or_create(user_id=user_id)
+        UserStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=shifted('comment_count', delta))
+
+
+def bump_many(model, field, deltas, key='pk'):
+    """Сдвигает field у многих строк: deltas — словарь {key: сдвиг}.
+
+    Строки с одинаковым сдвигом обновляются одним запросом.
+    """
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        for chunk in chunked(pks):
+            model.objects.filter(**{f'{key}__in': chunk}).update(
+                **{field: shifted(field, delta)})
+
+
+def bump_users(field, deltas):
+    """Увеличивает счётчик field у пользователей из deltas."""
+    with transaction.atomic():
+        for chunk in chunked(deltas):
+            existing = set(UserStats.objects.filter(
+                user_id__in=chunk).values_list('user_id', flat=True))
+            UserStats.objects.bulk_create(
+                (UserStats(user_id=user_id) for user_id in chunk
+                 if user_id not in existing),
+                ignore_conflicts=True,
+            )
+        bump_many(UserStats, field, deltas, key='user_id')
+
+
+def user_stats(user):
+    """Счётчики пользователя; у неактивного пользователя все нули."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+def reconcile():
+    """Пересчитывает все счётчики и возвращает число исправленных строк."""
+    fixed = 0
+    drifted_posts = Post.objects.annotate(
+        actual=count_of(Comment, 'post')
+    ).exclude(comment_count=F('actual')).values_list('pk', 'actual')
+    for pk, actual in drifted_posts.iterator():
+        Post.objects.filter(pk=pk).update(comment_count=actual)
+        fixed += 1
+    users = User.objects.annotate(
+        actual_posts=count_of(Post, 'author'),
+        actual_followers=count_of(Follow, 'author'),
+        actual_following=count_of(Follow, 'user'),
+    ).select_related('stats')
+    for user in users.iterator():
+        stats = user_stats(user)
+        actual = (user.actual_posts, user.actual_followers,
+                  user.actual_following)
+        if (stats.posts, stats.followers, stats.following) == actual:
+            continue
+        stats.posts, stats.followers, stats.following = actual
+        stats.save()
+        fixed += 1
+    return fixed
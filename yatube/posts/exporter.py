@@ -0,0 +1,136 @@
+"""Потоковая выгрузка постов, комментариев и подписок, см. export_posts.
+
+Записи читаются через iterator() кусками по CHUNK_SIZE строк и сразу
+превращаются в текст, поэтому память не зависит от размера таблиц.
+Формат записей тот же, что понимает import_posts.
+"""
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .importer import RECORD_TYPES
+from .models import Comment, Follow, Post
+
+CHUNK_SIZE = 2000
+FORMATS = ('jsonl', 'csv')
+CSV_FIELDS = ('type', 'id', 'user', 'author', 'group', 'post', 'text',
+              'pub_date', 'created', 'image')
+
+
+def parse_since(value):
+    """Момент начала выгрузки из ISO 8601; без зоны — в текущей."""
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError(f'непонятная дата {value!r}')
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def post_records(since=None, after_id=None):
+    posts = Post.objects.order_by('pk')
+    if since is not None:
+        # Отредактированные посты тоже попадают в новую выгрузку.
+        posts = posts.filter(updated__gte=since)
+    if after_id is not None:
+        posts = posts.filter(pk__gt=after_id)
+    rows = posts.values_list(
+        'pk', 'author__username', 'group__slug', 'text', 'pub_date', 'image')
+    for pk, author, group, text, pub_date, image in rows.iterator(
+            chunk_size=CHUNK_SIZE):
+        yield {'type': 'post', 'id': pk, 'author': author, 'group': group,
+               'text': text, 'pub_date': pub_date.isoformat(),
+               'image': image}
+
+
+def comment_records(since=None, after_id=None):
+    comments = Comment.objects.order_by('pk')
+    if since is not None:
+        comments = comments.filter(created__gte=since)
+    if after_id is not None:
+        comments = comments.filter(pk__gt=after_id)
+    rows = comments.values_list(
+        'pk', 'post_id', 'author__username', 'text', 'created')
+    for pk, post_id, author, text, created in rows.iterator(
+            chunk_size=CHUNK_SIZE):
+        yield {'type': 'comment', 'id': pk, 'post': post_id,
+               'author': author, 'text': text,
+               'created': created.isoformat()}
+
+
+def follow_records(since=None, after_id=None):
+    # У подписок нет даты, выгрузку продолжают по id.
+    follows = Follow.objects.order_by('pk')
+    if after_id is not None:
+        follows = follows.filter(pk__gt=after_id)
+    rows = follows.values_list('pk', 'user__username', 'author__username')
+    for pk, user, author in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield {'type': 'follow', 'id': pk, 'user': user, 'author': author}
+
+
+RECORDS = {
+    'post': post_records,
+    'comment': comment_records,
+    'follow': follow_records,
+}
+
+
+def export_records(types=RECORD_TYPES, since=None, after=None):
+    """Записи выбранных типов; посты идут раньше комментариев к ним.
+
+    after — словарь «тип: id», с которого продолжать выгрузку: у каждой
+    таблицы своя последовательность id.
+    """
+    after = after or {}
+    for kind in RECORD_TYPES:
+        if kind in types:
+            yield from RECORDS[kind](since, after.get(kind))
+
+
+def jsonl_lines(batch):
+    return ''.join(
+        json.dumps({key: value for key, value in record.items()
+                    if value not in (None, '')}, ensure_ascii=False) + '\n'
+        for record in batch)
+
+
+def csv_writer():
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_FIELDS)
+    writer.writeheader()
+
+    def lines(batch):
+        writer.writerows(batch)
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+    return lines
+
+
+def export_chunks(records, format='jsonl'):
+    """Куски текста по CHUNK_SIZE записей в формате format."""
+    lines = csv_writer() if format == 'csv' else jsonl_lines
+    records = iter(records)
+    while True:
+        batch = list(islice(records, CHUNK_SIZE))
+        text = lines(batch)
+        if text:
+            yield text
+        if not batch:
+            return
+
+
+def gzipped(chunks):
+    """Сжимает поток текстовых кусков в gzip на лету."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from .models import FeedEntry, Follow, Post, PullAuthor
+from .paginators import CursorPaginator
+from .utils import chunked
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    fan_out_posts([post])
+
+
+def fan_out_posts(posts):
+    """Раскладывает новые посты по лентам подписчиков их авторов."""
+    authors = {post.author_id for post in posts}
+    authors -= pull_authors(authors)
+    crowded = set()
+    for chunk in chunked(authors):
+        crowded.update(Follow.objects.filter(author_id__in=chunk).values(
+            'author_id').annotate(followers=Count('pk')).filter(
+            followers__gt=settings.FEED_FANOUT_LIMIT).values_list(
+            'author_id', flat=True))
+    pks = [post.pk for post in posts if post.author_id in authors - crowded]
+    with transaction.atomic():
+        PullAuthor.objects.bulk_create(
+            (PullAuthor(author_id=author_id) for author_id in crowded),
+            ignore_conflicts=True,
+        )
+        for chunk in chunked(pks):
+            insert_entries(
+                f'SELECT follow.{column(Follow, "user")}, post.id, '
+                f'post.{column(Post, "pub_date")} '
+                f'FROM {table(Post)} post JOIN {table(Follow)} follow '
+                f'ON follow.{column(Follow, "author")} = '
+                f'post.{column(Post, "author")} '
+                f'WHERE post.id IN ({", ".join(["%s"] * len(chunk))})',
+                [chunk])
+
+
+def backfill_follow(follow):
+    """Добавляет в ленту нового подписчика последние посты автора."""
+    backfill_follows([follow])
+
+
+def backfill_follows(follows):
+    """Добавляет в ленты новых подписчиков последние посты авторов."""
+    authors = pull_authors({follow.author_id for follow in follows})
+    insert_entries(
+        f'SELECT %s, id, {column(Post, "pub_date")} FROM {table(Post)} '
+        f'WHERE {column(Post, "author")} = %s '
+        f'ORDER BY {column(Post, "pub_date")} DESC LIMIT %s',
+        [(follow.user_id, follow.author_id, settings.FEED_BACKFILL_LIMIT)
+         for follow in follows if follow.author_id not in authors])
+
+
+def table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def column(model, field):
+    return connection.ops.quote_name(model._meta.get_field(field).column)
+
+
+def insert_entries(select, params_list):
+    """Вставляет в ленты строки (читатель, пост, дата) из запроса select.
+
+    Записи вставляются одним INSERT ... SELECT на набор параметров,
+    без загрузки постов и подписчиков в Python; уже разложенные
+    записи пропускаются.
+    """
+    if not params_list:
+        return
+    ops = connection.ops
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} {table(FeedEntry)} '
+        f'({column(FeedEntry, "user")}, {column(FeedEntry, "post")}, '
+        f'{column(FeedEntry, "pub_date")}) {select} '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params_list)
+
+
+def pull_authors(author_ids):
+    """Авторы из author_ids, чьи посты не раскладываются по лентам."""
+    found = set()
+    for chunk in chunked(author_ids):
+        found.update(PullAuthor.objects.filter(
+            author_id__in=chunk).values_list('author_id', flat=True))
+    return found
+
+
+def prune_follow(follow):
+    """Убирает из ленты отписавшегося читателя посты автора."""
+    FeedEntry.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.author_id).delete()
+
+
+class FollowFeedPaginator(CursorPaginator):
+    """Лента подписок по ключу (pub_date, id) из индекса FeedEntry.
+
+    object_list — посты без условия на читателя. Ключи страницы берутся
+    из записей ленты по индексу (читатель, дата, пост) и из постов
+    авторов без раскладки по индексу (автор, дата), не больше страницы
+    из каждого; посты грузятся по этим id тем же запросом и сливаются
+    сортировкой страницы.
+    """
+
+    def __init__(self, object_list, per_page, user=None, **kwargs):
+        self.entries = FeedEntry.objects.filter(user=user)
+        self.pull_authors = Follow.objects.filter(
+            user=user, author__pull_author__isnull=False
+        ).values('author_id')
+        super().__init__(object_list, per_page, **kwargs)
+
+    def _rows(self, offset=0, key=None, forward=True):
+        entries = self.entries
+        pulled = Post.objects.filter(author_id__in=self.pull_authors)
+        if key is not None:
+            further = self._further if forward else self._closer
+            entries = entries.filter(further(*key, 'post_id'))
+            pulled = pulled.filter(further(*key))
+        date, pk = self.ordering
+        entries = entries.order_by(date, pk.replace('pk', 'post_id'))
+        pulled = pulled.order_by(date, pk)
+        posts = self.object_list
+        if not forward:
+            entries, pulled = entries.reverse(), pulled.reverse()
+            posts = posts.reverse()
+        # Каждый источник отдаёт не больше строк, чем нужно странице.
+        limit = offset + self.per_page + 1
+        return list(posts.filter(
+            Q(pk__in=entries.values('post_id')[:limit])
+            | Q(pk__in=pulled.values('pk')[:limit])
+        )[offset:limit])
@@ -1,6 +1,12 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
 
-from .models import Comment, Post
+from .exporter import FORMATS, parse_since
+from .importer import RECORD_TYPES
+from .models import Comment, Group, Post
+from .uploads import RejectedUpload, decodes_whole, downscale
 
 
 class PostForm(forms.ModelForm):
@@ -13,6 +19,41 @@ class PostForm(forms.ModelForm):
                       'group': 'Выберете группу из списка.',
                       'image': 'Выберите картинку для вашего поста,'}
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if isinstance(self.files.get('image'), RejectedUpload):
+            # Содержимое отброшенного файла пусто, и поле сообщит о битой
+            # картинке; вместо этого показываем причину.
+            field = self.fields['image']
+            field.error_messages = {
+                **field.error_messages,
+                'invalid_image': self.too_large_message(),
+            }
+
+    @staticmethod
+    def too_large_message():
+        return 'Картинка больше {}.'.format(
+            filesizeformat(settings.POST_IMAGE_MAX_SIZE))
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        if image.size > settings.POST_IMAGE_MAX_SIZE:
+            raise forms.ValidationError(self.too_large_message())
+        width, height = image.image.size
+        max_width, max_height = settings.POST_IMAGE_MAX_DIMENSIONS
+        if width > max_width or height > max_height:
+            raise forms.ValidationError(
+                f'Картинка больше {max_width}x{max_height} пикселей.')
+        # Такую картинку пришлось бы целиком развернуть в памяти.
+        if (width * height > settings.POST_IMAGE_MAX_DECODE_PIXELS
+                and decodes_whole(image.image)):
+            raise forms.ValidationError(
+                'Картинка слишком большая, уменьшите её или сохраните '
+                'в JPEG.')
+        return downscale(image)
+
 
 class CommentForm(forms.ModelForm):
     class Meta():
@@ -21,3 +62,41 @@ class CommentForm(forms.ModelForm):
         labels = {'text': 'Текст комментария', }
         help_texts = {
             'text': 'Введите текст вашего комментария в этом поле.', }
+
+
+class SearchForm(forms.Form):
+    ORDER_CHOICES = (('rank', 'По релевантности'), ('date', 'По дате'))
+
+    q = forms.CharField(label='Найти', max_length=200)
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(), to_field_name='slug',
+        required=False, label='Группа')
+    author = forms.CharField(max_length=150, required=False, label='Автор')
+    order = forms.ChoiceField(
+        choices=ORDER_CHOICES, required=False, label='Порядок')
+
+
+class ExportForm(forms.Form):
+    format = forms.ChoiceField(
+        choices=[(name, name) for name in FORMATS], required=False)
+    types = forms.MultipleChoiceField(
+        choices=[(kind, kind) for kind in RECORD_TYPES], required=False)
+    since = forms.CharField(required=False)
+    after_post = forms.IntegerField(min_value=0, required=False)
+    after_comment = forms.IntegerField(min_value=0, required=False)
+    after_follow = forms.IntegerField(min_value=0, required=False)
+    gzip = forms.BooleanField(required=False)
+
+    def clean_format(self):
+        return self.cleaned_data['format'] or 'jsonl'
+
+    def clean_since(self):
+        if not self.cleaned_data['since']:
+            return None
+        try:
+            return parse_since(self.cleaned_data['since'])
+        except ValueError as error:
+            raise forms.ValidationError(str(error))
+
+    def clean_types(self):
+        return self.cleaned_data['types'] or RECORD_TYPES
@@ -0,0 +1,93 @@
+"""Граф подписок в кеше: кто на кого подписан, без запросов к базе.
+
+Для каждого пользователя кешируются два отсортированных массива id:
+на кого он подписан и кто подписан на него. Подписка и отписка
+сбрасывают массивы обоих участников сразу и после фиксации транзакции,
+как invalidate_feeds, а следующее чтение собирает их заново одним
+запросом. Перезаписывать массив на месте нельзя: подписчики популярного
+автора меняются из разных процессов, и изменения бы терялись.
+"""
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+# Поле Follow, по которому ищется пользователь, и поле с соседом.
+COLUMNS = {
+    FOLLOWING: ('user_id', 'author_id'),
+    FOLLOWERS: ('author_id', 'user_id'),
+}
+
+
+def cache_key(kind, user_id):
+    return f'follow-graph:{kind}:{user_id}'
+
+
+def load(kind, user_ids):
+    """Множества соседей для user_ids: из кеша, недостающие — из базы."""
+    user_ids = set(user_ids) - {None}
+    keys = {cache_key(kind, user_id): user_id for user_id in user_ids}
+    found = {
+        keys[key]: frozenset(array('I', packed))
+        for key, packed in cache.get_many(keys).items()
+    }
+    missing = user_ids - found.keys()
+    if missing:
+        field, other = COLUMNS[kind]
+        loaded = {user_id: [] for user_id in missing}
+        for user_id, other_id in Follow.objects.filter(
+                **{f'{field}__in': missing}).values_list(field, other):
+            loaded[user_id].append(other_id)
+        cache.set_many({
+            cache_key(kind, user_id): array('I', sorted(ids)).tobytes()
+            for user_id, ids in loaded.items()
+        }, settings.FOLLOW_GRAPH_TIMEOUT)
+        found.update(
+            (user_id, frozenset(ids)) for user_id, ids in loaded.items())
+    return found
+
+
+def following_ids(user_id):
+    """id авторов, на которых подписан пользователь."""
+    if user_id is None:
+        return frozenset()
+    return load(FOLLOWING, [user_id])[user_id]
+
+
+def follower_ids(user_id):
+    """id подписчиков пользователя."""
+    if user_id is None:
+        return frozenset()
+    return load(FOLLOWERS, [user_id])[user_id]
+
+
+def is_following(user_id, author_id):
+    return author_id in following_ids(user_id)
+
+
+def follower_count(user_id):
+    return len(follower_ids(user_id))
+
+
+def mutual_ids(user_id):
+    """id тех, с кем у пользователя взаимная подписка."""
+    return following_ids(user_id) & follower_ids(user_id)
+
+
+def is_mutual(user_id, other_id):
+    return other_id in mutual_ids(user_id)
+
+
+def forget(*follows):
+    """Сбрасывает массивы участников подписок сразу и после фиксации."""
+    keys = set()
+    for follow in follows:
+        keys.add(cache_key(FOLLOWING, follow.user_id))
+        keys.add(cache_key(FOLLOWERS, follow.author_id))
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
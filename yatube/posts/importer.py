@@ -0,0 +1,274 @@
+"""Массовый импорт постов, комментариев и подписок, см. import_posts.
+
+Записи вставляются через bulk_create, поэтому сигналы не срабатывают:
+ленты, счётчики и поисковый индекс обновляются здесь же, пачками,
+в той же транзакции, что и сами записи.
+"""
+import csv
+import json
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, feed, graph, search
+from .caching import invalidate_feeds
+from .models import Comment, Follow, Group, Post, User
+from .utils import chunked
+
+RECORD_TYPES = ('post', 'comment', 'follow')
+
+
+class SkipRecord(Exception):
+    """Запись нельзя импортировать; сообщение объясняет почему."""
+
+
+def read_records(stream, format):
+    """Пары (номер строки, словарь полей) из JSONL или CSV."""
+    if format == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=2):
+            yield number, {
+                key: value for key, value in row.items() if value}
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            yield number, {'type': None, 'error': str(error)}
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise SkipRecord(f'непонятная дата {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def insert(model, objects, date_fields):
+    """bulk_create с ключами от базы и датами date_fields из объектов.
+
+    bulk_create ставит в поля auto_now и auto_now_add текущее время,
+    поэтому даты из файла записываются следом, одним UPDATE на пачку.
+    """
+    dates = [[getattr(obj, field) for field in date_fields]
+             for obj in objects]
+    model.objects.bulk_create(objects)
+    if not connection.features.can_return_ids_from_bulk_insert:
+        # SQLite не возвращает ключи, но после первой вставки транзакция
+        # держит блокировку записи: последние ключи таблицы — наши,
+        # в порядке вставки.
+        pks = model.objects.order_by('-pk').values_list(
+            'pk', flat=True)[:len(objects)]
+        for obj, pk in zip(objects, reversed(list(pks))):
+            obj.pk = pk
+    for obj, values in zip(objects, dates):
+        for field, value in zip(date_fields, values):
+            setattr(obj, field, value)
+    # По три параметра на запись: UPDATE укладывается в лимит SQLite.
+    for chunk in chunked(objects, 300):
+        for field in date_fields:
+            model.objects.filter(pk__in=[obj.pk for obj in chunk]).update(
+                **{field: Case(
+                    *(When(pk=obj.pk, then=Value(getattr(obj, field)))
+                      for obj in chunk),
+                    output_field=model._meta.get_field(field))})
+
+
+class Lookup:
+    """Кеш соответствий «значение поля -> pk» для авторов и групп."""
+
+    def __init__(self, model, field, create=None):
+        self.model = model
+        self.field = field
+        self.create = create
+        self.pks = {}
+
+    def load(self, keys):
+        missing = {key for key in keys if key} - self.pks.keys()
+        for chunk in chunked(missing):
+            found = self._fetch(chunk)
+            absent = [key for key in chunk if key not in found]
+            if absent and self.create is not None:
+                self.model.objects.bulk_create(map(self.create, absent))
+                found = self._fetch(chunk)
+            self.pks.update(dict.fromkeys(chunk))
+            self.pks.update(found)
+
+    def _fetch(self, keys):
+        return dict(self.model.objects.filter(
+            **{f'{self.field}__in': keys}).values_list(self.field, 'pk'))
+
+    def get(self, key, what):
+        pk = self.pks.get(key)
+        if pk is None:
+            raise SkipRecord(f'{what} {key!r} не найден')
+        return pk
+
+
+def new_user(username):
+    return User(username=username, password=make_password(None))
+
+
+class Importer:
+    """Копит записи и вставляет их пачками по batch_size.
+
+    Посты из файла получают новые первичные ключи; комментарии ссылаются
+    на пост по полю id из того же импорта.
+    """
+
+    def __init__(self, batch_size=1000, create_users=False,
+                 on_skip=None, on_flush=None):
+        self.batch_size = batch_size
+        self.users = Lookup(
+            User, 'username', create=new_user if create_users else None)
+        self.groups = Lookup(Group, 'slug')
+        self.post_ids = {}
+        self.buffers = {kind: [] for kind in RECORD_TYPES}
+        self.created = Counter()
+        self.skipped = 0
+        self.images = 0
+        self.on_skip = on_skip
+        self.on_flush = on_flush
+
+    def add(self, number, record):
+        kind = record.get('type')
+        if kind not in self.buffers:
+            self.skip(number, record.get('error') or f'тип {kind!r}')
+            return
+        self.buffers[kind].append((number, record))
+        if sum(map(len, self.buffers.values())) >= self.batch_size:
+            self.flush()
+
+    def skip(self, number, reason):
+        self.skipped += 1
+        if self.on_skip is not None:
+            self.on_skip(number, reason)
+
+    def flush(self):
+        with transaction.atomic():
+            self.users.load(
+                record.get(field)
+                for kind, fields in (('post', ['author']),
+                                     ('comment', ['author']),
+                                     ('follow', ['user', 'author']))
+                for _, record in self.buffers[kind] for field in fields)
+            self.groups.load(
+                record.get('group') for _, record in self.buffers['post'])
+            self.import_posts(self.valid('post', self.build_post))
+            self.import_comments(self.valid('comment', self.build_comment))
+            self.import_follows(self.valid('follow', self.build_follow))
+        for buffer in self.buffers.values():
+            buffer.clear()
+        if self.on_flush is not None:
+            self.on_flush(self)
+
+    def finish(self):
+        self.flush()
+        invalidate_feeds()
+
+    def valid(self, kind, build):
+        """Объекты из буфера kind; плохие записи пропускаются."""
+        built = []
+        for number, record in self.buffers[kind]:
+            try:
+                built.append(build(record))
+            except SkipRecord as error:
+                self.skip(number, str(error))
+        return built
+
+    def build_post(self, record):
+        import_id = record.get('id')
+        if import_id is not None and str(import_id) in self.post_ids:
+            raise SkipRecord(f'пост {import_id!r} уже импортирован')
+        if not record.get('text'):
+            raise SkipRecord('пустой текст')
+        pub_date = parse_date(record.get('pub_date'))
+        post = Post(
+            text=record['text'],
+            author_id=self.users.get(record.get('author'), 'автор'),
+            group_id=(self.groups.get(record['group'], 'группа')
+                      if record.get('group') else None),
+            image=record.get('image', ''),
+            pub_date=pub_date,
+            updated=pub_date,
+        )
+        # Пока ключ не выдан, запомним, под каким id пост был в файле.
+        post.import_id = import_id
+        if import_id is not None:
+            self.post_ids[str(import_id)] = None
+        return post
+
+    def build_comment(self, record):
+        post_id = self.post_ids.get(str(record.get('post')))
+        if not post_id:
+            raise SkipRecord(f'пост {record.get("post")!r} не импортирован')
+        if not record.get('text'):
+            raise SkipRecord('пустой текст')
+        return Comment(
+            post_id=post_id,
+            author_id=self.users.get(record.get('author'), 'автор'),
+            text=record['text'],
+            created=parse_date(record.get('created')),
+        )
+
+    def build_follow(self, record):
+        follow = Follow(
+            user_id=self.users.get(record.get('user'), 'читатель'),
+            author_id=self.users.get(record.get('author'), 'автор'),
+        )
+        if follow.user_id == follow.author_id:
+            raise SkipRecord('подписка на самого себя')
+        return follow
+
+    def import_posts(self, posts):
+        if not posts:
+            return
+        insert(Post, posts, ['pub_date', 'updated'])
+        for post in posts:
+            if post.import_id is not None:
+                self.post_ids[str(post.import_id)] = post.pk
+            self.images += bool(post.image)
+        search.index_posts(posts)
+        counters.bump_users(
+            'posts', Counter(post.author_id for post in posts))
+        feed.fan_out_posts(posts)
+        self.created['post'] += len(posts)
+
+    def import_comments(self, comments):
+        if not comments:
+            return
+        insert(Comment, comments, ['created'])
+        counters.bump_many(Post, 'comment_count', Counter(
+            comment.post_id for comment in comments))
+        self.created['comment'] += len(comments)
+
+    def import_follows(self, follows):
+        pairs = {(follow.user_id, follow.author_id): follow
+                 for follow in follows}
+        existing = set()
+        for chunk in chunked(pairs):
+            existing.update(Follow.objects.filter(
+                user_id__in={user_id for user_id, _ in chunk},
+                author_id__in={author_id for _, author_id in chunk},
+            ).values_list('user_id', 'author_id'))
+        follows = [follow for pair, follow in pairs.items()
+                   if pair not in existing]
+        if not follows:
+            return
+        Follow.objects.bulk_create(follows)
+        counters.bump_users(
+            'following', Counter(follow.user_id for follow in follows))
+        counters.bump_users(
+            'followers', Counter(follow.author_id for follow in follows))
+        feed.backfill_follows(follows)
+        graph.forget(*follows)
+        self.created['follow'] += len(follows)
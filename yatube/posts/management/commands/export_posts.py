@@ -0,0 +1,87 @@
+import sys
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exporter import (FORMATS, export_chunks, export_records, gzipped,
+                            parse_since)
+from posts.importer import RECORD_TYPES
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты, комментарии и подписки в JSONL или CSV '
+            'потоком, не загружая таблицы в память.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Куда писать, «-» — стандартный вывод.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат; по умолчанию по расширению.')
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Сжимать в gzip; включается само для файлов .gz.')
+        parser.add_argument(
+            '--types', nargs='+', choices=RECORD_TYPES, default=RECORD_TYPES,
+            help='Какие записи выгружать.')
+        parser.add_argument(
+            '--since',
+            help='Только посты, изменённые с этого момента, и комментарии, '
+                 'оставленные с него (ISO 8601).')
+        for kind in RECORD_TYPES:
+            parser.add_argument(
+                f'--after-{kind}', type=int, metavar='ID',
+                help=f'Только записи {kind} с id больше этого.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        compress = options['gzip'] or path.endswith('.gz')
+        format = options['format'] or (
+            'csv' if path.replace('.gz', '').endswith('.csv') else 'jsonl')
+        since = self.since(options['since'])
+        if since and 'follow' in options['types']:
+            self.stderr.write(
+                'У подписок нет даты: --since их не ограничивает.')
+        exported = Counter()
+
+        def counted(records):
+            for record in records:
+                exported[record['type']] += 1
+                yield record
+
+        after = {kind: options[f'after_{kind}'] for kind in RECORD_TYPES}
+        chunks = export_chunks(counted(export_records(
+            options['types'], since, after)), format)
+        if compress:
+            chunks = gzipped(chunks)
+        stream = self.open(path, compress)
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+        finally:
+            if path != '-':
+                stream.close()
+        self.stderr.write(
+            f'Выгружено: постов {exported["post"]}, '
+            f'комментариев {exported["comment"]}, '
+            f'подписок {exported["follow"]}')
+
+    @staticmethod
+    def since(value):
+        if not value:
+            return None
+        try:
+            return parse_since(value)
+        except ValueError as error:
+            raise CommandError(error)
+
+    @staticmethod
+    def open(path, binary):
+        if path == '-':
+            return sys.stdout.buffer if binary else sys.stdout
+        try:
+            if binary:
+                return open(path, 'wb')
+            return open(path, 'w', encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(error)
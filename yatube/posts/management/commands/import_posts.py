@@ -0,0 +1,67 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import Importer, read_records
+
+
+class Command(BaseCommand):
+    help = ('Импортирует посты, комментарии и подписки из JSONL или CSV '
+            'пачками через bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл с записями, «-» — стандартный ввод.')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат файла; по умолчанию по расширению.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько записей вставлять в одной транзакции.')
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Создавать неизвестных авторов без пароля.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        self.started = time.monotonic()
+        importer = Importer(
+            batch_size=options['batch_size'],
+            create_users=options['create_users'],
+            on_skip=self.report_skip,
+            on_flush=self.report_progress,
+        )
+        try:
+            stream = (sys.stdin if path == '-'
+                      else open(path, encoding='utf-8', newline=''))
+        except OSError as error:
+            raise CommandError(error)
+        with stream:
+            for number, record in read_records(stream, format):
+                importer.add(number, record)
+            importer.finish()
+        self.stdout.write(
+            f'Готово: {self.summary(importer)}, '
+            f'пропущено: {importer.skipped}')
+        if importer.images:
+            self.stdout.write(
+                'У постов есть картинки: превью подготовит warm_thumbnails.')
+
+    def report_skip(self, number, reason):
+        self.stderr.write(f'Строка {number} пропущена: {reason}')
+
+    def report_progress(self, importer):
+        elapsed = time.monotonic() - self.started
+        total = sum(importer.created.values())
+        self.stdout.write(
+            f'{self.summary(importer)}; '
+            f'{total / elapsed if elapsed else 0:.0f} записей/с')
+
+    @staticmethod
+    def summary(importer):
+        return (f'постов {importer.created["post"]}, '
+                f'комментариев {importer.created["comment"]}, '
+                f'подписок {importer.created["follow"]}')
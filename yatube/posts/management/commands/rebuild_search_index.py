@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Заново строит полнотекстовый индекс постов.'
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write('Индекс поиска перестроен.')
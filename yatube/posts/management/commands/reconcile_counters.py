@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def handle(self, *args, **options):
+        fixed = reconcile()
+        self.stdout.write(f'Исправлено счётчиков: {fixed}')
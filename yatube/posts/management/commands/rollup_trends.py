@@ -0,0 +1,47 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+
+from posts import rollups
+from posts.models import RollupMark, Trend
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает подборки «Обсуждают сейчас» и «Популярные '
+            'группы» по событиям после прошлого пересчёта.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='забыть оценки и пересчитать по всей истории')
+        parser.add_argument(
+            '--every', type=float, metavar='SECONDS',
+            help='не выходить, а пересчитывать раз в SECONDS секунд')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            with transaction.atomic():
+                RollupMark.objects.all().delete()
+                Trend.objects.all().delete()
+        self.run_once()
+        while options['every']:
+            time.sleep(options['every'])
+            # Ошибка одного пересчёта не останавливает следующие.
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception('Не удалось пересчитать подборки')
+            finally:
+                close_old_connections()
+
+    def run_once(self):
+        if not rollups.update():
+            self.stderr.write('События уже учёл другой процесс.')
+        lists = rollups.publish()
+        self.stdout.write(
+            f'Постов в подборке: {len(lists["posts"])}, '
+            f'групп: {len(lists["groups"])}')
@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Заранее готовит превью для картинок всех постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS or 1,
+            help='Число потоков, которые режут картинки.')
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True).distinct().iterator()
+        done = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            mapper = pool.map if options['workers'] > 1 else map
+            while True:
+                chunk = list(islice(names, CHUNK_SIZE))
+                if not chunk:
+                    break
+                list(mapper(generate, chunk))
+                done += len(chunk)
+                self.stdout.write(f'Обработано картинок: {done}')
+        self.stdout.write(f'Готово, картинок: {done}')
@@ -0,0 +1,90 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_feed_entries(apps, schema_editor):
+    # Те же правила, что у posts.feed.fan_out_posts и backfill_follows:
+    # авторы с числом подписчиков больше FEED_FANOUT_LIMIT читаются при
+    # показе ленты, остальным подписчики получают последние
+    # FEED_BACKFILL_LIMIT постов, по одному INSERT ... SELECT на автора.
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    PullAuthor = apps.get_model('posts', 'PullAuthor')
+    followers = Follow.objects.values('author_id').annotate(
+        total=Count('pk')).order_by()
+    PullAuthor.objects.bulk_create(
+        (PullAuthor(author_id=author_id) for author_id in followers.filter(
+            total__gt=settings.FEED_FANOUT_LIMIT).values_list(
+            'author_id', flat=True).iterator()),
+        batch_size=500,
+    )
+    authors = followers.filter(
+        total__lte=settings.FEED_FANOUT_LIMIT).values_list(
+        'author_id', flat=True)
+
+    connection = schema_editor.connection
+    ops = connection.ops
+
+    def table(model):
+        return ops.quote_name(model._meta.db_table)
+
+    def column(model, field):
+        return ops.quote_name(model._meta.get_field(field).column)
+
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} {table(FeedEntry)} '
+        f'({column(FeedEntry, "user")}, {column(FeedEntry, "post")}, '
+        f'{column(FeedEntry, "pub_date")}) '
+        f'SELECT follow.{column(Follow, "user")}, post.id, post.pub_date '
+        f'FROM {table(Follow)} follow JOIN ('
+        f'SELECT id, {column(Post, "pub_date")} AS pub_date '
+        f'FROM {table(Post)} WHERE {column(Post, "author")} = %s '
+        f'ORDER BY {column(Post, "pub_date")} DESC LIMIT %s) post '
+        f'ON follow.{column(Follow, "author")} = %s '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (author_id, settings.FEED_BACKFILL_LIMIT, author_id)
+            for author_id in authors.iterator()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0003_follow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PullAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pull_author', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date'], name='feedentry_user_pub_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='feedentry',
+            unique_together={('user', 'post')},
+        ),
+        migrations.RunPython(fill_feed_entries, migrations.RunPython.noop),
+    ]
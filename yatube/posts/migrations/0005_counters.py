@@ -0,0 +1,60 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field):
+    # Копия posts.counters.count_of: миграция не зависит от кода приложения.
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(Subquery(
+        rows.values(field).annotate(total=Count('pk')).values('total')), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post.objects.update(comment_count=count_of(Comment, 'post'))
+    users = User.objects.annotate(
+        post_total=count_of(Post, 'author'),
+        follower_total=count_of(Follow, 'author'),
+        following_total=count_of(Follow, 'user'),
+    ).values_list('pk', 'post_total', 'follower_total', 'following_total')
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk, posts=posts, followers=followers,
+                   following=following)
+         for pk, posts, followers, following in users.iterator()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0004_feedentry_pullauthor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('following', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:30
+
+from django.db import migrations
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def create_search_index(apps, schema_editor):
+    # Полнотекстовый индекс есть только на SQLite (FTS5); на других базах
+    # posts.search ищет по подстроке.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(text)')
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, text) '
+        f'SELECT id, text FROM posts_post')
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
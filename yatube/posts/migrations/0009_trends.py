@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupMark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, unique=True)),
+                ('last_id', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Trend',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'пост'), ('group', 'группа')], max_length=5)),
+                ('object_id', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trend',
+            index=models.Index(fields=['kind', '-score'], name='trend_kind_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trend',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_trend'),
+        ),
+    ]
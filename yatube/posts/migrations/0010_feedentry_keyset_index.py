@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_trends'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='feedentry',
+            name='feedentry_user_pub_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'pub_date', 'post'], name='feedentry_user_date_post_idx'),
+        ),
+    ]
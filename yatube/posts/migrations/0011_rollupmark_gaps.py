@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_feedentry_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupmark',
+            name='gaps',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
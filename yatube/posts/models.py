@@ -1,9 +1,31 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 
 User = get_user_model()
 
 
+class AtomicSaveMixin:
+    """Сохраняет запись вместе с обработчиками post_save в одной транзакции.
+
+    Обработчики обновляют счётчики и ленты, поэтому их изменения
+    не должны расходиться с самой записью. Поля из counter_fields
+    меняются только через F() и при обновлении записи не пишутся:
+    иначе устаревшее значение в памяти затёрло бы чужие приращения.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (self.counter_fields and not self._state.adding
+                and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            skipped = set(self.counter_fields) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped]
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
@@ -13,9 +35,22 @@ class Group(models.Model):
         return f'{self.title}'
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для карточек лент: автор и группа одним запросом."""
+        return self.select_related('author', 'group').defer(
+            'author__password',
+            'author__last_login',
+            'author__email',
+            'author__date_joined',
+            'group__description',
+        )
+
+
+class Post(AtomicSaveMixin, models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -33,16 +68,37 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+    counter_fields = ('comment_count',)
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name_plural = 'posts'
+        indexes = [
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['pub_date', 'id'],
+                         name='post_pub_date_id_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
-class Comment(models.Model):
+class CommentQuerySet(models.QuerySet):
+    def for_thread(self):
+        """Комментарии для ветки обсуждения вместе с авторами."""
+        return self.select_related('author').only(
+            'created', 'text', 'post',
+            'author__username', 'author__first_name', 'author__last_name',
+        )
+
+
+class Comment(AtomicSaveMixin, models.Model):
     created = models.DateTimeField(auto_now_add=True)
     post = models.ForeignKey(
         Post,
@@ -56,8 +112,16 @@ class Comment(models.Model):
     )
     text = models.TextField()
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
+
 
-class Follow(models.Model):
+class Follow(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -68,3 +132,90 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок, разложенная по читателям при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='feedentry_user_date_post_idx'),
+        ]
+
+
+class PullAuthor(models.Model):
+    """Автор, посты которого читаются из ленты без раскладки по читателям.
+
+    Отметка ставится, когда у автора становится больше
+    FEED_FANOUT_LIMIT подписчиков, и больше не снимается: иначе из лент
+    пропали бы посты, опубликованные без раскладки.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pull_author'
+    )
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые обновляются вместе с записями."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts = models.PositiveIntegerField(default=0)
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+
+
+class Trend(models.Model):
+    """Затухающая оценка поста или группы для подборок, см. posts.rollups."""
+    POST = 'post'
+    GROUP = 'group'
+    KINDS = ((POST, 'пост'), (GROUP, 'группа'))
+
+    kind = models.CharField(max_length=5, choices=KINDS)
+    object_id = models.PositiveIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'],
+                                    name='unique_trend'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', '-score'],
+                         name='trend_kind_score_idx'),
+        ]
+
+
+class RollupMark(models.Model):
+    """Последний учтённый подборками id в таблице событий.
+
+    gaps — id через запятую в окне перед last_id, которых не было при
+    пересчёте: их транзакции могли ещё не зафиксироваться.
+    """
+    name = models.CharField(max_length=20, unique=True)
+    last_id = models.PositiveIntegerField(default=0)
+    gaps = models.TextField(default='', blank=True)
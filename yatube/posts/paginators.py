@@ -0,0 +1,203 @@
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils import timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_cursor(obj, number, date_field='pub_date'):
+    """Упаковывает ключ (дата, id) и номер страницы в строку.
+
+    obj — объект модели или словарь из values() с ключами date_field и id.
+    """
+    if isinstance(obj, dict):
+        date, pk = obj[date_field], obj['id']
+    else:
+        date, pk = getattr(obj, date_field), obj.pk
+    raw = '{}.{}.{}'.format((date - EPOCH) // MICROSECOND, pk, number)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (дата, id, номер страницы) или None."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        timestamp, pk, number = (int(part) for part in raw.split('.'))
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        return None
+    if number < 1:
+        return None
+    return EPOCH + timestamp * MICROSECOND, pk, number
+
+
+def older_than(date, pk, date_field='pub_date', pk_field='pk'):
+    """Условие «раньше ключа» с отдельной границей для поиска по индексу."""
+    return Q(**{f'{date_field}__lte': date}) & (
+        Q(**{f'{date_field}__lt': date}) | Q(**{f'{pk_field}__lt': pk}))
+
+
+def newer_than(date, pk, date_field='pub_date', pk_field='pk'):
+    return Q(**{f'{date_field}__gte': date}) & (
+        Q(**{f'{date_field}__gt': date}) | Q(**{f'{pk_field}__gt': pk}))
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (date_field, id).
+
+    Страницы выбираются условием на ключ вместо OFFSET, и общее число
+    записей не считается, поэтому любая страница стоит как первая.
+    Старые ссылки вида ?page=N продолжают работать через срез.
+    По умолчанию сначала идут новые записи, с descending=False — старые.
+    """
+
+    date_field = 'pub_date'
+    descending = True
+    page_params = ('page', 'after', 'before')
+
+    def __init__(self, object_list, per_page, params=None, descending=None,
+                 **kwargs):
+        if descending is not None:
+            self.descending = descending
+        if self.ordering:
+            object_list = object_list.order_by(*self.ordering)
+        super().__init__(object_list, per_page, **kwargs)
+        # Остальные параметры запроса (например, фильтры поиска)
+        # сохраняются в ссылках на соседние страницы.
+        self.params = QueryDict(mutable=True)
+        for key, values in (params or QueryDict()).lists():
+            if key not in self.page_params:
+                self.params.setlist(key, values)
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    @property
+    def ordering(self):
+        sign = '-' if self.descending else ''
+        return (f'{sign}{self.date_field}', f'{sign}pk')
+
+    def _query(self, **page):
+        params = self.params.copy()
+        for key, value in page.items():
+            params[key] = value
+        return params.urlencode()
+
+    @property
+    def first_query(self):
+        return self._query()
+
+    @property
+    def next_query(self):
+        return self._query(after=self.next_cursor)
+
+    @property
+    def previous_query(self):
+        return self._query(before=self.previous_cursor)
+
+    def get_page(self, number=None, after=None, before=None):
+        after_key = decode_cursor(after)
+        if after_key is not None:
+            return self._after_page(*after_key)
+        before_key = decode_cursor(before)
+        if before_key is not None:
+            return self._before_page(*before_key)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        return self._number_page(max(number, 1))
+
+    def _number_page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = self._rows(offset=bottom)
+        if not rows and number > 1:
+            return self._number_page(1)
+        return self._build_page(
+            rows[:self.per_page], number, len(rows) > self.per_page)
+
+    def _further(self, date, pk, pk_field='pk'):
+        """Условие «после ключа» в порядке вывода."""
+        further = older_than if self.descending else newer_than
+        return further(date, pk, self.date_field, pk_field)
+
+    def _closer(self, date, pk, pk_field='pk'):
+        closer = newer_than if self.descending else older_than
+        return closer(date, pk, self.date_field, pk_field)
+
+    def _rows(self, offset=0, key=None, forward=True):
+        """До per_page + 1 записей со сдвига offset или за ключом key.
+
+        С forward=False записи берутся перед ключом, ближайшие первыми.
+        """
+        rows = self.object_list
+        if key is not None:
+            rows = rows.filter(
+                self._further(*key) if forward else self._closer(*key))
+        if not forward:
+            rows = rows.reverse()
+        return list(rows[offset:offset + self.per_page + 1])
+
+    def _after_page(self, date, pk, number):
+        rows = self._rows(key=(date, pk))
+        return self._build_page(
+            rows[:self.per_page], number + 1, len(rows) > self.per_page)
+
+    def _before_page(self, date, pk, number):
+        rows = self._rows(key=(date, pk), forward=False)
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        number = max(number - 1, 2) if has_previous else 1
+        return self._build_page(rows, number, True)
+
+    def _build_page(self, rows, number, has_next):
+        # Page.has_next() сравнивает номер с num_pages, поэтому вместо
+        # COUNT(*) num_pages ограничивается известной следующей страницей.
+        self.num_pages = number + 1 if has_next and rows else number
+        if rows:
+            if has_next:
+                self.next_cursor = encode_cursor(
+                    rows[-1], number, self.date_field)
+            if number > 1:
+                self.previous_cursor = encode_cursor(
+                    rows[0], number, self.date_field)
+        return Page(rows, number, self)
+
+
+class CommentPaginator(CursorPaginator):
+    """Комментарии по ключу (created, id), по индексу поста и даты."""
+
+    date_field = 'created'
+    descending = False
+
+
+class NumberedPaginator(CursorPaginator):
+    """Постраничный вывод по номеру для выборок со своим порядком.
+
+    Нужен там, где ключа (дата, id) нет, например для выдачи
+    поиска по релевантности; COUNT(*) при этом тоже не выполняется.
+    """
+
+    ordering = None
+
+    def get_page(self, number=None, after=None, before=None):
+        return super().get_page(number)
+
+    @property
+    def next_query(self):
+        return self._query(page=self.page_number + 1)
+
+    @property
+    def previous_query(self):
+        return self._query(page=self.page_number - 1)
+
+    def _build_page(self, rows, number, has_next):
+        self.page_number = number
+        return super()._build_page(rows, number, has_next)
@@ -0,0 +1,211 @@
+"""Подборки «Обсуждают сейчас» для главной и «Популярные группы».
+
+Оценка — сумма весов событий, затухающих с периодом полураспада
+TRENDING_HALF_LIFE: комментарий и публикация весят 1, новый подписчик
+автора — FOLLOW_WEIGHT каждому его свежему посту. В Trend хранится
+логарифм суммы, приведённой к началу эпохи: новое событие просто
+прибавляется к старой оценке, а порядок со временем не меняется и
+читается по индексу.
+
+update() учитывает события с id больше запомненных в RollupMark,
+publish() кладёт готовые списки в кеш под одним ключом, который и читают
+представления. Id выдаются до фиксации транзакции, поэтому событие с
+меньшим id может появиться уже после пересчёта: последние OVERLAP id до
+отметки перечитываются, а учитываются из них только те, которых при
+прошлом пересчёте не было (RollupMark.gaps). Пересчёт запускает команда
+rollup_trends, по расписанию или сама с --every.
+"""
+import math
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import bump_generation
+from .models import Comment, Follow, Group, Post, RollupMark, Trend
+from .utils import chunked
+
+ROLLUPS_KEY = 'posts:rollups'
+FOLLOW_WEIGHT = 0.5
+# Оценки, затухшие ниже этого веса, удаляются.
+PRUNE_WEIGHT = 0.01
+TEXT_LENGTH = 80
+EMPTY = {'posts': [], 'groups': []}
+# Сколько id до отметки перечитывать: событие с меньшим id могло
+# зафиксироваться позже пересчёта.
+OVERLAP = 1000
+MARK_NAMES = ('comment', 'post', 'follow')
+
+
+def rate():
+    return math.log(2) / settings.TRENDING_HALF_LIFE
+
+
+def log_weight(weight, moment):
+    """Логарифм веса события, приведённого к началу эпохи."""
+    return math.log(weight) + moment * rate()
+
+
+def log_add(first, second):
+    """log(e^first + e^second) без переполнения."""
+    if first < second:
+        first, second = second, first
+    if second == -math.inf:
+        return first
+    return first + math.log1p(math.exp(second - first))
+
+
+def _unseen(name, queryset, marks, new_marks):
+    """Строки queryset с id первым, ещё не учтённые подборками.
+
+    Отметка таблицы name и пропуски у неё попадают в new_marks, когда
+    строки прочитаны до конца.
+    """
+    last_id, gaps = marks[name]
+    recent = deque(maxlen=OVERLAP)
+    rows = queryset.filter(pk__gt=last_id - OVERLAP).order_by('pk')
+    for row in rows.iterator():
+        recent.append(row[0])
+        if row[0] > last_id or row[0] in gaps:
+            yield row
+    top = max(recent[-1] if recent else 0, last_id)
+    present = set(recent)
+    new_marks[name] = (top, frozenset(
+        pk for pk in range(max(top - OVERLAP, 0) + 1, top + 1)
+        if pk not in present))
+
+
+def collect(marks, now):
+    """Оценки новых событий по (вид, id) и новые отметки таблиц.
+
+    marks — словарь {таблица: (последний id, пропуски)}.
+    """
+    scores = defaultdict(lambda: -math.inf)
+    new_marks = {}
+    comments = Comment.objects.values_list(
+        'pk', 'created', 'post_id', 'post__group_id')
+    for pk, created, post_id, group_id in _unseen(
+            'comment', comments, marks, new_marks):
+        _add_event(scores, post_id, group_id, log_weight(
+            1, created.timestamp()))
+    posts = Post.objects.values_list('pk', 'pub_date', 'group_id')
+    for pk, pub_date, group_id in _unseen('post', posts, marks, new_marks):
+        _add_event(scores, pk, group_id, log_weight(1, pub_date.timestamp()))
+    # У подписки нет времени создания: её время — момент, когда её
+    # увидел пересчёт.
+    followers = defaultdict(int)
+    follows = Follow.objects.values_list('pk', 'author_id')
+    for pk, author_id in _unseen('follow', follows, marks, new_marks):
+        followers[author_id] += 1
+    fresh = datetime.fromtimestamp(
+        now - settings.TRENDING_WINDOW, timezone.utc)
+    for chunk in chunked(followers):
+        for pk, author_id in Post.objects.filter(
+                author_id__in=chunk, pub_date__gte=fresh,
+        ).values_list('pk', 'author_id'):
+            key = (Trend.POST, pk)
+            scores[key] = log_add(scores[key], log_weight(
+                FOLLOW_WEIGHT * followers[author_id], now))
+    return scores, new_marks
+
+
+def _add_event(scores, post_id, group_id, event):
+    scores[Trend.POST, post_id] = log_add(scores[Trend.POST, post_id], event)
+    if group_id is not None:
+        scores[Trend.GROUP, group_id] = log_add(
+            scores[Trend.GROUP, group_id], event)
+
+
+def merge(scores):
+    """Прибавляет оценки новых событий к сохранённым."""
+    by_kind = defaultdict(dict)
+    for (kind, object_id), score in scores.items():
+        by_kind[kind][object_id] = score
+    for kind, kind_scores in by_kind.items():
+        for chunk in chunked(kind_scores):
+            existing = list(Trend.objects.filter(
+                kind=kind, object_id__in=chunk))
+            for trend in existing:
+                trend.score = log_add(
+                    trend.score, kind_scores.pop(trend.object_id))
+            Trend.objects.bulk_update(existing, ['score'])
+        Trend.objects.bulk_create(
+            Trend(kind=kind, object_id=object_id, score=score)
+            for object_id, score in kind_scores.items())
+
+
+def update(now=None):
+    """Учитывает новые события; False, если их уже учёл другой процесс."""
+    now = time.time() if now is None else now
+    RollupMark.objects.bulk_create(
+        [RollupMark(name=name) for name in MARK_NAMES],
+        ignore_conflicts=True)
+    marks = {
+        name: (last_id, frozenset(map(int, filter(None, gaps.split(',')))))
+        for name, last_id, gaps in RollupMark.objects.values_list(
+            'name', 'last_id', 'gaps')
+    }
+    scores, new_marks = collect(marks, now)
+    # При первом пересчёте по всей истории старые события сразу затухли.
+    floor = log_weight(PRUNE_WEIGHT, now)
+    scores = {key: score for key, score in scores.items() if score >= floor}
+    with transaction.atomic():
+        # Транзакция начинается с записи отметок (см. comment_buffer.write),
+        # а условие на старую отметку не даёт двум процессам учесть одни
+        # и те же события дважды.
+        for name, mark in new_marks.items():
+            if mark != marks[name] and not RollupMark.objects.filter(
+                    name=name, last_id=marks[name][0],
+                    gaps=_join_ids(marks[name][1]),
+            ).update(last_id=mark[0], gaps=_join_ids(mark[1])):
+                transaction.set_rollback(True)
+                return False
+        merge(scores)
+        Trend.objects.filter(score__lt=floor).delete()
+    return True
+
+
+def _join_ids(ids):
+    return ','.join(map(str, sorted(ids)))
+
+
+def publish(now=None):
+    """Собирает списки из Trend и кладёт их в кеш под ROLLUPS_KEY."""
+    now = time.time() if now is None else now
+    size = settings.TRENDING_SIZE
+    ranked = list(Trend.objects.filter(kind=Trend.POST).order_by(
+        '-score').values_list('object_id', flat=True)[:size * 4])
+    fresh = datetime.fromtimestamp(
+        now - settings.TRENDING_WINDOW, timezone.utc)
+    posts = {
+        post['pk']: post for post in Post.objects.filter(
+            pk__in=ranked, pub_date__gte=fresh,
+        ).values('pk', 'text', 'author__username')
+    }
+    ranked_groups = list(Trend.objects.filter(kind=Trend.GROUP).order_by(
+        '-score').values_list('object_id', flat=True)[:size])
+    groups = Group.objects.in_bulk(ranked_groups)
+    rollups = {
+        'posts': [
+            {'id': pk, 'text': posts[pk]['text'][:TEXT_LENGTH],
+             'author': posts[pk]['author__username']}
+            for pk in ranked if pk in posts
+        ][:size],
+        'groups': [
+            {'slug': groups[pk].slug, 'title': groups[pk].title}
+            for pk in ranked_groups if pk in groups
+        ],
+    }
+    if cache.get(ROLLUPS_KEY) != rollups:
+        cache.set(ROLLUPS_KEY, rollups, None)
+        # Ленты закешированы вместе с прежними списками.
+        bump_generation()
+    return rollups
+
+
+def current():
+    """Готовые списки из кеша; до первого пересчёта они пусты."""
+    return cache.get(ROLLUPS_KEY) or EMPTY
@@ -0,0 +1,86 @@
+import re
+
+from django.db import connection
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def fts_query(text):
+    """Превращает ввод пользователя в запрос FTS5 из слов в кавычках."""
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', text))
+
+
+def index_post(post):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text])
+
+
+def index_posts(posts):
+    """Добавляет в индекс новые посты, например после bulk_create."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [(post.pk, post.text) for post in posts])
+
+
+def unindex_post(post):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+
+
+def rebuild_index():
+    """Заново заполняет индекс из таблицы постов."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}')
+
+
+def filter_posts(posts, text, ranked=True):
+    """Оставляет в posts посты, в тексте которых есть все слова запроса.
+
+    На SQLite поиск идёт по таблице FTS5, и с ranked=True результаты
+    упорядочены по релевантности (bm25). На других базах остаётся
+    поиск по подстроке без изменения порядка.
+    """
+    query = fts_query(text)
+    if not query:
+        return posts.none()
+    if not fts_available():
+        for word in re.findall(r'\w+', text):
+            posts = posts.filter(text__icontains=word)
+        return posts
+    posts = posts.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {Post._meta.db_table}.id',
+               f'{FTS_TABLE} MATCH %s'],
+        params=[query],
+    )
+    if ranked:
+        posts = posts.extra(
+            select={'rank': f'{FTS_TABLE}.rank'},
+            order_by=['rank', '-pub_date'],
+        )
+    return posts
+
+
+def search_posts(text, ranked=True):
+    return filter_posts(Post.objects.for_feed(), text, ranked)
@@ -0,0 +1,62 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import counters, feed, graph, search, thumbnails
+from .caching import invalidate_feeds
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.author_id, posts=1)
+        feed.fan_out_post(instance)
+    if instance.image:
+        thumbnails.enqueue(instance.image.name)
+    search.index_post(instance)
+    invalidate_feeds()
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, posts=-1)
+    search.unindex_post(instance)
+    invalidate_feeds()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_comments(instance.post_id, 1)
+    invalidate_feeds()
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    invalidate_feeds()
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.author_id, followers=1)
+        counters.bump_user(instance.user_id, following=1)
+        feed.backfill_follow(instance)
+        graph.forget(instance)
+    invalidate_feeds()
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, followers=-1)
+    counters.bump_user(instance.user_id, following=-1)
+    feed.prune_follow(instance)
+    graph.forget(instance)
+    invalidate_feeds()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    invalidate_feeds()
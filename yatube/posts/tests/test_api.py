@@ -0,0 +1,97 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+from yatube.settings import PAGINATOR_CONSTANT
+
+User = get_user_model()
+
+
+class ReadApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='yay', slug='yay', description='yay')
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}.', author=cls.author, group=cls.group)
+            for i in range(PAGINATOR_CONSTANT + 3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий.')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.guest_client = Client()
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_walk_with_cursors(self):
+        """Ленты отдают посты страницами по курсору, новые первыми"""
+        for url, client in (
+            (reverse('api:index'), self.guest_client),
+            (reverse('api:group_list', args=['yay']), self.guest_client),
+            (reverse('api:profile', args=['author']), self.guest_client),
+            (reverse('api:follow_index'), self.reader_client),
+        ):
+            with self.subTest(url=url):
+                seen = []
+                while url:
+                    data = client.get(url).json()
+                    seen.extend(post['id'] for post in data['results'])
+                    url = data['next']
+                self.assertEqual(
+                    seen, [post.pk for post in reversed(self.posts)])
+
+    def test_post_fields(self):
+        """Пост сериализуется целиком, а ?fields= оставляет нужное"""
+        post = self.posts[0]
+        data = self.guest_client.get(
+            reverse('api:post_detail', args=[post.pk])).json()
+        self.assertEqual(data, {
+            'id': post.pk, 'text': post.text,
+            'pub_date': post.pub_date.isoformat(), 'author': 'author',
+            'group': 'yay', 'image': None, 'comment_count': 1,
+        })
+        data = self.guest_client.get(
+            reverse('api:index'), {'fields': 'text'}).json()
+        self.assertEqual(data['results'][0], {'text': self.posts[-1].text})
+        self.assertIn('fields=text', data['next'])
+        response = self.guest_client.get(
+            reverse('api:index'), {'fields': 'text,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_profile_and_comments(self):
+        """Профиль отдаёт счётчики и подписку, комментарии — страницами"""
+        data = self.reader_client.get(
+            reverse('api:profile', args=['author'])).json()
+        self.assertEqual(data['author']['posts'], len(self.posts))
+        self.assertTrue(data['author']['is_following'])
+        data = self.guest_client.get(
+            reverse('api:comments', args=[self.posts[0].pk])).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Комментарий.'])
+        response = self.guest_client.get(reverse('api:comments', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Не найдено.'})
+        response = self.guest_client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_gzip(self):
+        """Ответ сжимается, если клиент принимает gzip"""
+        response = self.guest_client.get(
+            reverse('api:index'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), PAGINATOR_CONSTANT)
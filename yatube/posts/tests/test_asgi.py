@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core.asgi import WsgiToAsgi
+
+
+def echo(environ, start_response):
+    """WSGI-приложение, которое возвращает то, что получило."""
+    start_response('201 Created', [('Content-Type', 'application/json'),
+                                   ('X-Echo', 'yes')])
+    return [json.dumps({
+        'method': environ['REQUEST_METHOD'],
+        'path': environ['PATH_INFO'].encode('latin-1').decode('utf-8'),
+        'query': environ['QUERY_STRING'],
+        'type': environ['CONTENT_TYPE'],
+        'cookie': environ['HTTP_COOKIE'],
+        'body': environ['wsgi.input'].read().decode(),
+    }).encode(), b'']
+
+
+def call(application, scope, messages):
+    """Прогоняет один ASGI-вызов и возвращает отправленные сообщения."""
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+def http_scope(path, method='GET', headers=(), query=b''):
+    return {'type': 'http', 'method': method, 'path': path,
+            'query_string': query, 'headers': list(headers)}
+
+
+class AsgiTests(SimpleTestCase):
+    def test_request_and_response(self):
+        """Тело по частям, заголовки и путь доходят до WSGI-приложения"""
+        sent = call(WsgiToAsgi(echo, threads=2, spool_size=4), http_scope(
+            '/пост/', 'POST', query=b'a=1', headers=[
+                (b'content-type', b'text/plain'),
+                (b'cookie', b'a=1'), (b'cookie', b'b=2'),
+            ]), [
+            {'type': 'http.request', 'body': b'hello ', 'more_body': True},
+            {'type': 'http.request', 'body': b'world'},
+        ])
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertIn((b'x-echo', b'yes'), sent[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertEqual(json.loads(body), {
+            'method': 'POST', 'path': '/пост/', 'query': 'a=1',
+            'type': 'text/plain', 'cookie': 'a=1; b=2',
+            'body': 'hello world',
+        })
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_slow_client_does_not_hold_thread(self):
+        """Пока один клиент не забирает ответ, единственный поток свободен"""
+        application = WsgiToAsgi(echo, threads=1, spool_size=4)
+        second_done = None
+
+        async def request(send):
+            messages = [{'type': 'http.request', 'body': b''}]
+
+            async def receive():
+                return messages.pop() if messages else {
+                    'type': 'http.disconnect'}
+
+            await application(http_scope('/', headers=[
+                (b'content-type', b'text/plain'), (b'cookie', b'a=1'),
+            ]), receive, send)
+
+        async def slow_send(message):
+            await second_done.wait()
+
+        async def fast_send(message):
+            if (message['type'] == 'http.response.body'
+                    and not message.get('more_body', False)):
+                second_done.set()
+
+        async def main():
+            nonlocal second_done
+            second_done = asyncio.Event()
+            await asyncio.wait_for(asyncio.gather(
+                request(slow_send), request(fast_send)), timeout=5)
+
+        asyncio.run(main())
+        self.assertTrue(second_done.is_set())
+
+    def test_django_application(self):
+        """yatube.asgi отдаёт страницы сайта и проходит lifespan"""
+        from yatube.asgi import application
+
+        sent = call(application, http_scope(reverse('about:author')), [
+            {'type': 'http.request', 'body': b''}])
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(b'text/html', dict(sent[0]['headers'])[b'content-type'])
+        sent = call(WsgiToAsgi(echo, threads=1, spool_size=4),
+                    {'type': 'lifespan'},
+                    [{'type': 'lifespan.startup'},
+                     {'type': 'lifespan.shutdown'}])
+        self.assertEqual(
+            [message['type'] for message in sent],
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
@@ -0,0 +1,40 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+
+from yatube.env import CACHE_BACKENDS, cache_config
+
+
+class CacheConfigTests(TestCase):
+    def test_locations(self):
+        """Адрес кеша превращается в бэкенд и LOCATION"""
+        cases = {
+            'locmem://': ('locmem', ''),
+            'file:///var/tmp/yatube': ('file', '/var/tmp/yatube'),
+            'db://cache_table': ('db', 'cache_table'),
+            'memcached://mc1:11211,mc2:11211': (
+                'memcached', ['mc1:11211', 'mc2:11211']),
+            'memcached:///run/mc.sock': ('memcached', 'unix:/run/mc.sock'),
+            'redis://redis:6379/1?max_entries=5': (
+                'redis', 'redis://redis:6379/1'),
+        }
+        for url, (scheme, location) in cases.items():
+            with self.subTest(url=url):
+                config = cache_config(url)
+                self.assertEqual(config['BACKEND'], CACHE_BACKENDS[scheme])
+                self.assertEqual(config['LOCATION'], location)
+
+    def test_namespace_and_options(self):
+        """Префикс, версия и параметры адреса попадают в настройки"""
+        config = cache_config(
+            'file:///tmp/c?timeout=60&max_entries=10000&cull_frequency=4',
+            key_prefix='yatube', version=3)
+        self.assertEqual(config['KEY_PREFIX'], 'yatube')
+        self.assertEqual(config['VERSION'], 3)
+        self.assertEqual(config['TIMEOUT'], 60)
+        self.assertEqual(
+            config['OPTIONS'], {'MAX_ENTRIES': 10000, 'CULL_FREQUENCY': 4})
+
+    def test_unknown_scheme(self):
+        """Неизвестная схема — ошибка конфигурации, а не тихий LocMem"""
+        with self.assertRaises(ImproperlyConfigured):
+            cache_config('mongodb://localhost')
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import comment_buffer
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENT_BUFFER_DELAY=3600)
+class CommentBufferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост.', author=cls.author)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.detail_url = reverse('post:post_detail', args=[cls.post.pk])
+
+    def tearDown(self):
+        comment_buffer.flush()
+
+    def comment(self, post, text):
+        return self.reader_client.post(
+            reverse('post:add_comment', args=[post.pk]), {'text': text})
+
+    def test_author_sees_queued_comment(self):
+        """Комментарий из очереди видит только его автор до записи"""
+        response = self.comment(self.post, 'Из очереди.')
+        self.assertRedirects(response, self.detail_url)
+        self.assertFalse(Comment.objects.exists())
+        self.assertContains(self.reader_client.get(self.detail_url),
+                            'Из очереди.', count=1)
+        self.assertNotContains(self.author_client.get(self.detail_url),
+                               'Из очереди.')
+        comment_buffer.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        response = self.reader_client.get(self.detail_url)
+        self.assertContains(response, 'Из очереди.', count=1)
+        self.assertNotContains(response, 'скоро появится')
+
+    def test_flush_skips_deleted_posts(self):
+        """Комментарии к удалённому за время ожидания посту отбрасываются"""
+        doomed = Post.objects.create(text='Удалят.', author=self.author)
+        self.comment(doomed, 'Потеряется.')
+        self.comment(self.post, 'Останется.')
+        doomed.delete()
+        comment_buffer.flush()
+        self.assertEqual(
+            list(Comment.objects.values_list('text', flat=True)),
+            ['Останется.'])
@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+from yatube.settings import COMMENTS_PER_PAGE
+
+User = get_user_model()
+
+
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Обсуждаемый пост.', author=cls.author)
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f'Комментарий {i}.')
+            for i in range(COMMENTS_PER_PAGE * 2 + 5)
+        ]
+        cls.guest_client = Client()
+        cls.detail_url = reverse('post:post_detail', args=[cls.post.pk])
+        cls.comments_url = reverse('post:comments', args=[cls.post.pk])
+
+    def test_detail_shows_first_page(self):
+        """Страница поста показывает одну страницу комментариев"""
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(self.detail_url)
+        page = response.context['comments']
+        self.assertEqual(list(page), self.comments[:COMMENTS_PER_PAGE])
+        self.assertTrue(page.has_next())
+        self.assertContains(
+            response, f'Комментариев: {len(self.comments)}')
+        response = self.guest_client.get(self.detail_url, {'order': 'new'})
+        self.assertEqual(
+            list(response.context['comments']),
+            self.comments[::-1][:COMMENTS_PER_PAGE])
+
+    def test_load_more_json(self):
+        """Ссылки next в JSON проходят по всей ветке без повторов"""
+        url, seen = f'{self.comments_url}?format=json&order=new', []
+        while url:
+            data = self.guest_client.get(url).json()
+            seen.extend(comment['id'] for comment in data['comments'])
+            url = data['next']
+        self.assertEqual(
+            seen, [comment.pk for comment in reversed(self.comments)])
+
+    def test_load_more_fragment(self):
+        """Фрагмент отдаёт следующую страницу и ссылку на продолжение"""
+        first = self.guest_client.get(self.detail_url).context['comments']
+        response = self.guest_client.get(
+            self.comments_url, {'after': first.paginator.next_cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertEqual(
+            list(response.context['comments']),
+            self.comments[COMMENTS_PER_PAGE:COMMENTS_PER_PAGE * 2])
+        self.assertContains(response, 'Показать ещё')
+        response = self.guest_client.get(reverse('post:comments', args=[0]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.reader = User.objects.create_user(username='darkh01m')
+        cls.post = Post.objects.create(text='Test post.', author=cls.user)
+        Post.objects.create(text='Test post 2.', author=cls.user)
+        cls.guest_client = Client()
+
+    def test_post_and_comment_counters(self):
+        """Счётчики постов и комментариев меняются вместе с записями"""
+        self.assertEqual(self.user.stats.posts, 2)
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Test comment')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.user.stats.refresh_from_db()
+        self.assertEqual(self.user.stats.posts, 1)
+
+    def test_saving_stale_post_keeps_counter(self):
+        """Сохранение устаревшего поста не затирает счётчик комментариев"""
+        post = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Test comment')
+        post.text = 'Edited post.'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Edited post.')
+        self.assertEqual(post.comment_count, 1)
+
+    def test_drifted_counter_stays_at_zero(self):
+        """Удаление при разошедшемся нулевом счётчике не падает"""
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Test comment')
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=0)
+        UserStats.objects.filter(user=self.user).update(followers=0)
+        comment.delete()
+        follow.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertEqual(UserStats.objects.get(user=self.user).followers, 0)
+
+    def test_follow_counters(self):
+        """Подписка и отписка меняют счётчики обоих пользователей"""
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(UserStats.objects.get(user=self.user).followers, 1)
+        self.assertEqual(UserStats.objects.get(user=self.reader).following, 1)
+        follow.delete()
+        self.assertEqual(UserStats.objects.get(user=self.user).followers, 0)
+        self.assertEqual(UserStats.objects.get(user=self.reader).following, 0)
+
+    def test_profile_and_detail_without_count(self):
+        """Профиль и страница поста не выполняют COUNT"""
+        pages = (
+            reverse('post:profile', kwargs={'username': self.user}),
+            reverse('post:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(page)
+                self.assertEqual(response.context['post_count'], 2)
+                for query in queries:
+                    self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_reconcile_counters(self):
+        """Команда reconcile_counters исправляет расхождения"""
+        UserStats.objects.filter(user=self.user).update(posts=7)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=3)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('2', out.getvalue())
+        self.assertEqual(UserStats.objects.get(user=self.user).posts, 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
@@ -0,0 +1,55 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase
+
+from yatube.env import DATABASE_ENGINES, SQLITE_PRAGMAS, database_config
+
+
+class DatabaseConfigTests(TestCase):
+    def test_sqlite(self):
+        """Путь к файлу SQLite, прагмы и их замена параметрами адреса"""
+        config = database_config('sqlite:////var/lib/yatube.db',
+                                 conn_max_age=60, health_checks=True)
+        self.assertEqual(config['ENGINE'], DATABASE_ENGINES['sqlite'])
+        self.assertEqual(config['NAME'], '/var/lib/yatube.db')
+        self.assertEqual(config['PRAGMAS'], SQLITE_PRAGMAS)
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        config = database_config(
+            'sqlite:///db.sqlite3?journal_mode=delete&timeout=20'
+            '&conn_max_age=0', conn_max_age=60)
+        self.assertEqual(config['NAME'], 'db.sqlite3')
+        self.assertEqual(config['PRAGMAS']['journal_mode'], 'delete')
+        self.assertEqual(config['OPTIONS'], {'timeout': 20})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+
+    def test_postgres(self):
+        """Адрес PostgreSQL разбирается на части, PgBouncer без курсоров"""
+        config = database_config(
+            'postgres://yatube:p%40ss@db:5432/yatube?sslmode=require'
+            '&health_checks=true')
+        self.assertEqual(config['ENGINE'], DATABASE_ENGINES['postgres'])
+        self.assertEqual(
+            [config[key] for key in ('NAME', 'USER', 'PASSWORD', 'HOST',
+                                     'PORT')],
+            ['yatube', 'yatube', 'p@ss', 'db', '5432'])
+        self.assertEqual(config['OPTIONS'], {'sslmode': 'require'})
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertFalse(config['DISABLE_SERVER_SIDE_CURSORS'])
+        config = database_config('pgbouncer://yatube@pool:6432/yatube')
+        self.assertTrue(config['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertNotIn('PRAGMAS', config)
+
+    def test_unknown_scheme(self):
+        """Неизвестная схема — ошибка конфигурации"""
+        with self.assertRaises(ImproperlyConfigured):
+            database_config('mysql://localhost/yatube')
+
+    def test_pragmas_applied(self):
+        """Прагмы выполняются на каждом новом соединении SQLite"""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0],
+                             SQLITE_PRAGMAS['busy_timeout'])
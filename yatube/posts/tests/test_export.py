@@ -0,0 +1,124 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.group = Group.objects.create(
+            title='yay', slug='yay', description='yay')
+        cls.old_post = Post.objects.create(
+            text='Старый пост.', author=cls.author, group=cls.group)
+        cls.new_post = Post.objects.create(
+            text='Новый пост.', author=cls.author)
+        Comment.objects.create(
+            post=cls.old_post, author=cls.reader, text='Комментарий.')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            updated=datetime(2015, 1, 1, tzinfo=timezone.utc))
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def export(self, suffix, *args):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        os.close(handle)
+        err = io.StringIO()
+        try:
+            call_command('export_posts', path, *args, stderr=err)
+            with open(path, 'rb') as file:
+                content = file.read()
+        finally:
+            os.remove(path)
+        return content, err.getvalue()
+
+    def test_export_jsonl(self):
+        """Выгрузка пишет записи в формате import_posts"""
+        content, err = self.export('.jsonl')
+        records = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['post', 'post', 'comment', 'follow'])
+        self.assertEqual(records[0]['id'], self.old_post.pk)
+        self.assertEqual(records[0]['group'], 'yay')
+        self.assertNotIn('group', records[1])
+        self.assertEqual(records[2]['post'], self.old_post.pk)
+        self.assertEqual(records[3]['user'], 'reader')
+        self.assertIn('постов 2, комментариев 1, подписок 1', err)
+
+    def test_incremental_export(self):
+        """--since и --after-post отбирают только новые записи"""
+        content, _ = self.export(
+            '.jsonl', '--since', '2020-01-01T00:00', '--types', 'post')
+        records = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(
+            [record['id'] for record in records], [self.new_post.pk])
+        content, _ = self.export(
+            '.jsonl', '--after-post', str(self.old_post.pk),
+            '--types', 'post')
+        self.assertEqual(
+            [json.loads(line)['id'] for line in content.decode().splitlines()],
+            [self.new_post.pk])
+
+    def test_after_is_per_type(self):
+        """У каждого типа записей свой id, с которого продолжать выгрузку"""
+        comment = Comment.objects.get()
+        content, err = self.export(
+            '.jsonl', '--after-post', str(self.new_post.pk),
+            '--after-comment', str(comment.pk - 1))
+        records = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(
+            [(record['type'], record['id']) for record in records],
+            [('comment', comment.pk), ('follow', Follow.objects.get().pk)])
+        response = self.admin_client.get(
+            reverse('post:export'),
+            {'types': ['comment', 'follow'], 'after_comment': comment.pk})
+        records = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)['type'] for line in records], ['follow'])
+
+    def test_export_csv_gzip(self):
+        """Файл .csv.gz сжимается и читается как CSV"""
+        content, _ = self.export('.csv.gz')
+        rows = list(csv.DictReader(io.StringIO(
+            gzip.decompress(content).decode())))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1]['text'], 'Новый пост.')
+
+    def test_export_endpoint(self):
+        """Выгрузка по HTTP доступна только персоналу и идёт потоком"""
+        url = reverse('post:export')
+        client = Client()
+        client.force_login(self.reader)
+        self.assertEqual(client.get(url).status_code, 302)
+        response = self.admin_client.get(
+            url, {'types': 'follow', 'gzip': 'on'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        records = gzip.decompress(
+            b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(
+            json.loads(records[0]),
+            {'type': 'follow', 'id': Follow.objects.get().pk,
+             'user': 'reader', 'author': 'author'})
+        response = self.admin_client.get(url, {'since': 'вчера'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.feed import FollowFeedPaginator
+from posts.models import FeedEntry, Follow, Post, PullAuthor
+
+User = get_user_model()
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='HasNoName')
+        cls.author = User.objects.create_user(username='darkh01m')
+        cls.stranger = User.objects.create_user(username='h3rringt0n')
+        cls.old_post = Post.objects.create(
+            text='Old post.', author=cls.author)
+        cls.stranger_post = Post.objects.create(
+            text='Stranger post.', author=cls.stranger)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.reverse_follow_index = reverse('post:follow_index')
+
+    def feed(self):
+        return list(FollowFeedPaginator(
+            Post.objects.all(), 10, user=self.reader).get_page())
+
+    def test_follow_backfills_feed(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора"""
+        self.reader_client.get(reverse(
+            'post:profile_follow', kwargs={'username': self.author}))
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков, но не чужие"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='New post.', author=self.author)
+        entry = FeedEntry.objects.get(user=self.reader, post=new_post)
+        self.assertEqual(entry.pub_date, new_post.pub_date)
+        self.assertFalse(FeedEntry.objects.filter(
+            user=self.stranger, post=new_post).exists())
+        response = self.reader_client.get(self.reverse_follow_index)
+        self.assertIn(new_post, response.context['page_obj'])
+        self.assertNotIn(self.stranger_post, response.context['page_obj'])
+
+    def test_unfollow_prunes_feed(self):
+        """Отписка убирает посты автора из ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(reverse(
+            'post:profile_unfollow', kwargs={'username': self.author}))
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярного автора читаются из ленты без раскладки"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='New post.', author=self.author)
+        self.assertTrue(
+            PullAuthor.objects.filter(author=self.author).exists())
+        self.assertFalse(FeedEntry.objects.filter(post=new_post).exists())
+        self.assertEqual(
+            self.feed(), [new_post, self.old_post])
+
+    def test_paginator_merges_pull_authors(self):
+        """Страницы ленты по ключу сливают разложенные и читаемые посты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.stranger)
+        PullAuthor.objects.create(author=self.stranger)
+        for number in range(3):
+            Post.objects.create(text=f'Post {number}.', author=self.author)
+            Post.objects.create(
+                text=f'Pulled {number}.', author=self.stranger)
+        expected = list(Post.objects.filter(
+            author__in=[self.author, self.stranger]
+        ).order_by('-pub_date', '-pk'))
+        pages = []
+        cursor = None
+        while True:
+            paginator = FollowFeedPaginator(
+                Post.objects.all(), 3, user=self.reader)
+            pages.append(list(paginator.get_page(after=cursor)))
+            cursor = paginator.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(sum(pages, []), expected)
+        previous = paginator.get_page(before=paginator.previous_cursor)
+        self.assertEqual(list(previous), pages[-2])
@@ -1,12 +1,14 @@
 # deals/tests/tests_form.py
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.forms import PostForm
 from posts.models import Comment, Group, Post
@@ -16,7 +18,7 @@ User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class TaskCreateFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -166,3 +168,66 @@ class TaskCreateFormTests(TestCase):
             self.reverse_test_post_for_comment_details
         )
         self.assertIn(test_comment, response_for_post.context['comments'])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.reverse_post_create = reverse('post:post_create')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @staticmethod
+    def get_image(name, size, image_format='PNG'):
+        buffer = BytesIO()
+        Image.new('RGB', size, color=(255, 0, 0)).save(buffer, image_format)
+        return SimpleUploadedFile(
+            name=name, content=buffer.getvalue(),
+            content_type=f'image/{image_format.lower()}')
+
+    def post_image(self, image):
+        return self.authorized_client.post(
+            self.reverse_post_create,
+            data={'text': 'Test post with image.', 'image': image})
+
+    @override_settings(POST_IMAGE_MAX_SIZE=64)
+    def test_oversized_file_rejected(self):
+        """Слишком большой файл отклоняется с понятной ошибкой"""
+        response = self.post_image(self.get_image('big.png', (40, 40)))
+        self.assertFormError(
+            response, 'form', 'image', PostForm.too_large_message())
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_DIMENSIONS=(20, 20))
+    def test_too_many_pixels_rejected(self):
+        """Картинка больше допустимых размеров отклоняется"""
+        response = self.post_image(self.get_image('wide.png', (40, 10)))
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 20x20 пикселей.')
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_STORED_DIMENSIONS=(20, 20))
+    def test_stored_image_downscaled(self):
+        """Оригинал уменьшается до хранимых размеров"""
+        self.post_image(self.get_image('large.png', (40, 10)))
+        post = Post.objects.get()
+        self.assertEqual((post.image.width, post.image.height), (20, 5))
+
+    @override_settings(POST_IMAGE_MAX_DECODE_PIXELS=100)
+    def test_large_png_rejected_before_decoding(self):
+        """Большой PNG отклоняется, JPEG того же размера принимается"""
+        response = self.post_image(self.get_image('large.png', (40, 10)))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка слишком большая, уменьшите её или сохраните в JPEG.')
+        self.assertFalse(Post.objects.exists())
+        self.post_image(self.get_image('large.jpg', (40, 10), 'JPEG'))
+        self.assertTrue(Post.objects.exists())
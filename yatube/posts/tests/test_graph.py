@@ -0,0 +1,81 @@
+from array import array
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import graph
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lookups_are_cached(self):
+        """После первого чтения проверки подписок не ходят в базу"""
+        with self.assertNumQueries(2):
+            graph.following_ids(self.reader.pk)
+            graph.follower_ids(self.reader.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(graph.is_following(self.reader.pk, self.author.pk))
+            self.assertFalse(
+                graph.is_following(self.reader.pk, self.stranger.pk))
+            self.assertFalse(graph.is_mutual(self.reader.pk, self.author.pk))
+            self.assertFalse(graph.is_following(None, self.author.pk))
+
+    def test_writes_update_graph(self):
+        """Подписка и отписка сразу видны в графе обоих участников"""
+        self.assertEqual(graph.follower_count(self.author.pk), 1)
+        author_client = Client()
+        author_client.force_login(self.author)
+        author_client.get(reverse(
+            'post:profile_follow', args=[self.reader.username]))
+        self.assertTrue(graph.is_mutual(self.reader.pk, self.author.pk))
+        self.assertEqual(
+            graph.mutual_ids(self.author.pk), {self.reader.pk})
+        author_client.get(reverse(
+            'post:profile_unfollow', args=[self.reader.username]))
+        self.assertFalse(graph.is_following(self.author.pk, self.reader.pk))
+        self.assertEqual(graph.follower_ids(self.reader.pk), set())
+        response = author_client.get(reverse(
+            'post:profile_unfollow', args=[self.reader.username]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_writes_ignore_stale_graph(self):
+        """Подписка и отписка пишут в базу, даже если граф в кеше устарел"""
+        cache.set(graph.cache_key(graph.FOLLOWING, self.reader.pk),
+                  array('I', [self.stranger.pk]).tobytes())
+        self.reader_client.get(reverse(
+            'post:profile_follow', args=[self.stranger.username]))
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.stranger).exists())
+        cache.set(graph.cache_key(graph.FOLLOWING, self.reader.pk),
+                  array('I').tobytes())
+        response = self.reader_client.get(reverse(
+            'post:profile_unfollow', args=[self.author.username]))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+
+    def test_feed_cards_show_following(self):
+        """Карточки ленты отмечают авторов, на которых подписан читатель"""
+        Post.objects.create(text='Пост автора.', author=self.author)
+        Post.objects.create(text='Пост незнакомца.', author=self.stranger)
+        response = self.reader_client.get(reverse('post:index'))
+        self.assertContains(response, 'Вы подписаны на автора', count=1)
+        response = Client().get(reverse('post:index'))
+        self.assertNotContains(response, 'Вы подписаны на автора')
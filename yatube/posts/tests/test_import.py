@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.counters import user_stats
+from posts.feed import FollowFeedPaginator
+from posts.models import Comment, Follow, Group, Post
+from posts.search import search_posts
+
+User = get_user_model()
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='yay', slug='yay', description='yay')
+
+    def import_file(self, content, suffix='.jsonl', *args):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            file.write(content)
+        out, err = StringIO(), StringIO()
+        try:
+            call_command(
+                'import_posts', path, *args, stdout=out, stderr=err)
+        finally:
+            os.remove(path)
+        return out.getvalue(), err.getvalue()
+
+    def jsonl(self, *records):
+        return ''.join(json.dumps(record) + '\n' for record in records)
+
+    def test_import_keeps_derived_data(self):
+        """Импорт ставит даты из файла и обновляет счётчики, ленты и поиск"""
+        out, err = self.import_file(self.jsonl(
+            {'type': 'follow', 'user': 'reader', 'author': 'author'},
+            {'type': 'post', 'id': 'a1', 'author': 'author', 'group': 'yay',
+             'text': 'Старый пост о кошках.',
+             'pub_date': '2015-03-01T10:00:00+00:00'},
+            {'type': 'post', 'id': 'a2', 'author': 'author',
+             'text': 'Второй старый пост.', 'pub_date': '2015-03-02T10:00'},
+            {'type': 'comment', 'post': 'a1', 'author': 'reader',
+             'text': 'Комментарий.', 'created': '2015-03-03T10:00:00Z'},
+            {'type': 'post', 'author': 'nobody', 'text': 'Без автора.'},
+            {'type': 'comment', 'post': 'missing', 'author': 'reader',
+             'text': 'Потерянный комментарий.'},
+        ), '.jsonl', '--batch-size', '2')
+        self.assertIn('постов 2, комментариев 1, подписок 1', out)
+        self.assertIn('Строка 5 пропущена', err)
+        self.assertIn('Строка 6 пропущена', err)
+        post = Post.objects.get(text='Старый пост о кошках.')
+        self.assertEqual(
+            post.pub_date, datetime(2015, 3, 1, 10, tzinfo=timezone.utc))
+        self.assertEqual(post.updated, post.pub_date)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(Comment.objects.get().created.year, 2015)
+        self.author.refresh_from_db()
+        stats = user_stats(self.author)
+        self.assertEqual((stats.posts, stats.followers), (2, 1))
+        self.assertEqual(user_stats(self.reader).following, 1)
+        self.assertEqual(len(FollowFeedPaginator(
+            Post.objects.all(), 10, user=self.reader).get_page()), 2)
+        self.assertEqual(list(search_posts('кошках')), [post])
+
+    def test_import_csv_creates_users(self):
+        """CSV читается так же, а с --create-users появляются авторы"""
+        self.import_file(
+            'type,id,author,user,text,pub_date\n'
+            'post,1,newcomer,,Пост из CSV.,2016-01-01T00:00:00Z\n'
+            'follow,,newcomer,reader,,\n'
+            'follow,,newcomer,reader,,\n',
+            '.csv', '--create-users')
+        newcomer = User.objects.get(username='newcomer')
+        self.assertFalse(newcomer.has_usable_password())
+        self.assertEqual(Post.objects.get().author, newcomer)
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader, author=newcomer).count(),
+            1)
+        self.assertEqual(user_stats(newcomer).followers, 1)
+
+    def test_import_does_not_reuse_deleted_ids(self):
+        """Ключи выдаёт база: id удалённого поста не достаётся новому"""
+        deleted = Post.objects.create(text='Удалённый.', author=self.author)
+        deleted_pk = deleted.pk
+        deleted.delete()
+        self.import_file(self.jsonl(
+            {'type': 'post', 'id': 'a1', 'author': 'author',
+             'text': 'Новый пост.', 'pub_date': '2015-03-01T10:00:00Z'},
+            {'type': 'comment', 'post': 'a1', 'author': 'reader',
+             'text': 'Комментарий.', 'created': '2015-03-02T10:00:00Z'},
+        ))
+        post = Post.objects.get()
+        self.assertGreater(post.pk, deleted_pk)
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
@@ -0,0 +1,61 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.instrumentation import registry
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.staff = User.objects.create_user(
+            username='staff', is_staff=True)
+        cls.post = Post.objects.create(text='Test post.', author=cls.user)
+        cls.guest_client = Client()
+        cls.staff_client = Client()
+        cls.staff_client.force_login(cls.staff)
+        cls.reverse_index = reverse('post:index')
+        cls.reverse_report = reverse('instrumentation')
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    def test_server_timing(self):
+        """Ответ несёт Server-Timing с SQL, шаблоном и кешем"""
+        timing = self.guest_client.get(self.reverse_index)['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertIn('template;dur=', timing)
+        self.assertRegex(timing, r'sql;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r'cache;desc="hit=\d+ miss=[1-9]')
+        timing = self.guest_client.get(self.reverse_index)['Server-Timing']
+        self.assertNotIn('sql', timing)
+        self.assertNotIn('template', timing)
+
+    def test_report(self):
+        """Сводка по представлениям доступна только персоналу"""
+        for _ in range(3):
+            self.guest_client.get(self.reverse_index)
+        response = self.guest_client.get(self.reverse_report)
+        self.assertEqual(response.status_code, 302)
+        report = json.loads(self.staff_client.get(self.reverse_report).content)
+        index = report['views']['post:index']
+        self.assertEqual(index['requests'], 3)
+        self.assertEqual(sum(index['buckets'].values()), 3)
+        self.assertIn('sql', index['metrics'])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        """Без выборки запросы не измеряются"""
+        response = self.guest_client.get(self.reverse_index)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(registry.snapshot(), {})
@@ -1,7 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import Follow, Group, Post
 
 User = get_user_model()
 
@@ -29,3 +30,10 @@ class PostModelTest(TestCase):
         self.assertEqual(str(self.post),
                          self.post.text[:15],
                          'Название модели Post работает неправильно')
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на автора не создаёт вторую запись."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=reader, author=self.user)
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from posts.paginators import CursorPaginator, decode_cursor, encode_cursor
+
+from yatube.settings import PAGINATOR_CONSTANT
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        Post.objects.bulk_create(
+            Post(text=f'Test post {i}.', author=cls.user)
+            for i in range(PAGINATOR_CONSTANT * 2 + 5))
+        cls.guest_client = Client()
+        cls.reverse_index = reverse('post:index')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_round_trip(self):
+        """Курсор декодируется в тот же ключ и номер страницы"""
+        post = Post.objects.first()
+        pub_date, pk, number = decode_cursor(encode_cursor(post, 3))
+        self.assertEqual(pub_date, post.pub_date)
+        self.assertEqual(pk, post.pk)
+        self.assertEqual(number, 3)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        """Испорченный курсор открывает первую страницу"""
+        for cursor in ('', 'garbage', '!!!', encode_cursor(
+                Post.objects.first(), 1)[:-3]):
+            with self.subTest(cursor=cursor):
+                page_obj = CursorPaginator(
+                    Post.objects.all(), PAGINATOR_CONSTANT
+                ).get_page(after=cursor)
+                self.assertEqual(page_obj.number, 1)
+
+    def test_cursor_walk_covers_all_posts(self):
+        """Переходы по курсорам обходят все посты без повторов"""
+        seen = []
+        params = {}
+        while True:
+            cache.clear()
+            response = self.guest_client.get(self.reverse_index, params)
+            page_obj = response.context['page_obj']
+            seen.extend(post.pk for post in page_obj)
+            if not page_obj.has_next():
+                break
+            params = {'after': page_obj.paginator.next_cursor}
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(page_obj.number, 3)
+
+    def test_before_cursor_returns_previous_page(self):
+        """Курсор before возвращает ту же страницу, что и прямой переход"""
+        first = self.guest_client.get(self.reverse_index).context['page_obj']
+        cache.clear()
+        second = self.guest_client.get(
+            self.reverse_index,
+            {'after': first.paginator.next_cursor}).context['page_obj']
+        cache.clear()
+        back = self.guest_client.get(
+            self.reverse_index,
+            {'before': second.paginator.previous_cursor}).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertEqual(back.number, 1)
+        self.assertFalse(back.has_previous())
+
+    def test_legacy_page_number(self):
+        """Старые ссылки ?page=N ведут на ту же страницу"""
+        response = self.guest_client.get(self.reverse_index, {'page': 3})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 3)
+        self.assertEqual(len(page_obj), 5)
+        self.assertFalse(page_obj.has_next())
+
+    def test_no_count_query(self):
+        """Страница выбирается без COUNT и OFFSET"""
+        page_obj = CursorPaginator(
+            Post.objects.all(), PAGINATOR_CONSTANT).get_page()
+        with CaptureQueriesContext(connection) as queries:
+            page_obj = CursorPaginator(
+                Post.objects.all(), PAGINATOR_CONSTANT
+            ).get_page(after=page_obj.paginator.next_cursor)
+            list(page_obj)
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql'].upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class QueryCountTests(TestCase):
+    """Число запросов страниц не зависит от числа постов и комментариев."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='HasNoName')
+        cls.group = Group.objects.create(
+            title='yay', slug='yay', description='yay')
+        authors = [
+            User.objects.create_user(username=f'author{i}')
+            for i in range(5)
+        ]
+        for i, author in enumerate(authors):
+            Follow.objects.create(user=cls.reader, author=author)
+            for j in range(2):
+                Post.objects.create(
+                    text=f'Test post {i}.{j}.', author=author,
+                    group=cls.group if j else None)
+        cls.post = Post.objects.create(
+            text='Commented post.', author=authors[0], group=cls.group)
+        for author in authors:
+            Comment.objects.create(
+                post=cls.post, author=author, text='Test comment')
+        cls.author = authors[0]
+        cls.guest_client = Client()
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_guest_pages_queries(self):
+        pages = {
+            reverse('post:index'): 1,
+            reverse('post:group_list', kwargs={'slug': self.group.slug}): 2,
+            reverse('post:profile', kwargs={'username': self.author}): 2,
+            reverse('post:post_detail', kwargs={'post_id': self.post.pk}): 2,
+        }
+        for page, queries in pages.items():
+            with self.subTest(page=page):
+                with self.assertNumQueries(queries):
+                    self.guest_client.get(page)
+
+    def test_follow_index_queries(self):
+        # Сессия, пользователь и страница: ключи ленты и авторы без
+        # раскладки выбираются подзапросами.
+        with self.assertNumQueries(3):
+            self.reader_client.get(reverse('post:follow_index'))
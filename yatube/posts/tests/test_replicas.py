@@ -0,0 +1,87 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import PIN_COOKIE
+from posts.models import Post
+
+from yatube.env import database_config
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_PIN_SECONDS=5)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Реплика — отдельный файл SQLite, «репликация» — копия базы."""
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.databases['replica'] = database_config(
+            f'sqlite:///{cls.replica_path}')
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        os.remove(cls.replica_path)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            text='Старый текст.', author=self.author)
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.detail_url = reverse('post:post_detail', args=[self.post.pk])
+        self.replicate()
+
+    @staticmethod
+    def replicate():
+        for alias in ('default', 'replica'):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(
+            connections['replica'].connection)
+
+    def test_reads_go_to_replica(self):
+        """Чтение идёт с реплики, пока она не догнала основную базу"""
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст.')
+        response = self.guest_client.get(self.detail_url)
+        self.assertContains(response, 'Старый текст.')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.replicate()
+        self.assertContains(
+            self.guest_client.get(self.detail_url), 'Новый текст.')
+
+    def test_writer_reads_own_writes(self):
+        """После записи автор читает из основной базы, остальные — нет"""
+        response = self.author_client.post(
+            reverse('post:add_comment', args=[self.post.pk]),
+            {'text': 'Свежий комментарий.'})
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+        self.assertContains(
+            self.author_client.get(self.detail_url), 'Свежий комментарий.')
+        self.assertNotContains(
+            self.guest_client.get(self.detail_url), 'Свежий комментарий.')
+
+    def test_fresh_feed_from_replica_is_not_cached(self):
+        """Ленту с отстающей реплики не кешируют и не читают из основной"""
+        Post.objects.create(text='Только в основной.', author=self.author)
+        self.assertNotContains(
+            self.guest_client.get(reverse('post:index')),
+            'Только в основной.')
+        self.replicate()
+        self.assertContains(
+            self.guest_client.get(reverse('post:index')),
+            'Только в основной.')
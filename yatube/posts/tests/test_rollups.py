@@ -0,0 +1,113 @@
+import time
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import rollups
+from posts.models import Comment, Follow, Group, Post, RollupMark, Trend
+
+User = get_user_model()
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.quiet = Group.objects.create(
+            title='Тихая', slug='quiet', description='Тихая')
+        cls.busy = Group.objects.create(
+            title='Шумная', slug='busy', description='Шумная')
+        cls.calm_post = Post.objects.create(
+            text='Спокойный пост.', author=cls.author, group=cls.quiet)
+        cls.hot_post = Post.objects.create(
+            text='Горячий пост.', author=cls.author, group=cls.busy)
+        cls.guest_client = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, count):
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.reader, text='Комментарий.')
+            for _ in range(count))
+
+    def test_rollups_rank_by_recent_activity(self):
+        """Больше свежих комментариев — выше в обеих подборках"""
+        self.comment(self.hot_post, 3)
+        self.comment(self.calm_post, 1)
+        call_command('rollup_trends', stdout=StringIO())
+        response = self.guest_client.get(reverse('post:index'))
+        self.assertEqual(
+            [post['id'] for post in response.context['trending']],
+            [self.hot_post.pk, self.calm_post.pk])
+        self.assertContains(response, 'Обсуждают сейчас')
+        response = self.guest_client.get(
+            reverse('post:group_list', args=['quiet']))
+        self.assertEqual(
+            [group['slug'] for group in response.context['popular_groups']],
+            ['busy', 'quiet'])
+
+    def test_update_is_incremental(self):
+        """Пересчёт учитывает только новые события и затухание"""
+        rollups.update()
+        self.assertEqual(
+            RollupMark.objects.get(name='post').last_id, self.hot_post.pk)
+        calm = Trend.objects.get(kind=Trend.POST, object_id=self.calm_post.pk)
+        hot = Trend.objects.get(kind=Trend.POST, object_id=self.hot_post.pk)
+        self.assertTrue(rollups.update())
+        self.assertEqual(Trend.objects.get(pk=hot.pk).score, hot.score)
+        # Комментарий, написанный на период полураспада позже публикации,
+        # весит вдвое больше неё.
+        self.comment(self.calm_post, 1)
+        later = datetime.now(timezone.utc) + timedelta(
+            seconds=settings.TRENDING_HALF_LIFE)
+        Comment.objects.filter(post=self.calm_post).update(created=later)
+        rollups.update(now=later.timestamp())
+        calm.refresh_from_db()
+        self.assertAlmostEqual(
+            calm.score - hot.score, rollups.log_weight(3, 0), places=3)
+        self.assertEqual(Trend.objects.count(), 4)
+
+    def test_late_commit_below_mark_counted_once(self):
+        """Событие с id меньше отметки учитывается один раз"""
+        self.comment(self.calm_post, 3)
+        late = Comment.objects.filter(post=self.calm_post).order_by('pk')[1]
+        late_pk = late.pk
+        late.delete()
+        rollups.update()
+        mark = RollupMark.objects.get(name='comment')
+        self.assertGreater(mark.last_id, late_pk)
+        self.assertIn(str(late_pk), mark.gaps.split(','))
+        calm = Trend.objects.get(kind=Trend.POST, object_id=self.calm_post.pk)
+        # Транзакция, взявшая id раньше, зафиксировалась после пересчёта.
+        Comment.objects.create(
+            pk=late_pk, post=self.calm_post, author=self.reader,
+            text='Поздний комментарий.', created=late.created)
+        rollups.update()
+        grown = Trend.objects.get(pk=calm.pk).score
+        self.assertGreater(grown, calm.score)
+        self.assertEqual(RollupMark.objects.get(name='comment').gaps, '')
+        rollups.update()
+        self.assertEqual(Trend.objects.get(pk=calm.pk).score, grown)
+
+    def test_follow_growth_and_pruning(self):
+        """Новые подписчики поднимают свежие посты автора, старое удаляется"""
+        now = time.time()
+        rollups.update(now)
+        before = Trend.objects.get(
+            kind=Trend.POST, object_id=self.calm_post.pk).score
+        Follow.objects.create(user=self.reader, author=self.author)
+        rollups.update(now)
+        after = Trend.objects.get(
+            kind=Trend.POST, object_id=self.calm_post.pk).score
+        self.assertGreater(after, before)
+        rollups.update(now + 30 * 24 * 60 * 60)
+        self.assertFalse(Trend.objects.exists())
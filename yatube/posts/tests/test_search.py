@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.search import search_posts
+
+from yatube.settings import PAGINATOR_CONSTANT
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.user2 = User.objects.create_user(username='darkh01m')
+        cls.group = Group.objects.create(
+            title='yay', slug='yay', description='yay')
+        cls.cat_post = Post.objects.create(
+            text='Кошка спит на окне.', author=cls.user, group=cls.group)
+        cls.cats_post = Post.objects.create(
+            text='Кошка и кошка: две кошки.', author=cls.user2)
+        cls.dog_post = Post.objects.create(
+            text='Собака гуляет.', author=cls.user)
+        cls.guest_client = Client()
+        cls.reverse_search = reverse('post:search')
+
+    def search(self, **params):
+        response = self.guest_client.get(self.reverse_search, params)
+        return list(response.context['page_obj'])
+
+    def test_search_finds_words(self):
+        """Поиск находит посты со всеми словами запроса без учёта регистра"""
+        self.assertEqual(
+            set(self.search(q='КОШКА')), {self.cat_post, self.cats_post})
+        self.assertEqual(self.search(q='кошка окне'), [self.cat_post])
+        self.assertEqual(self.search(q='"); DROP TABLE'), [])
+
+    def test_search_ranking(self):
+        """По умолчанию выше пост, где слово встречается чаще"""
+        self.assertEqual(self.search(q='кошка')[0], self.cats_post)
+
+    def test_search_filters(self):
+        """Выдачу можно ограничить группой и автором"""
+        self.assertEqual(
+            self.search(q='кошка', group=self.group.slug), [self.cat_post])
+        self.assertEqual(
+            self.search(q='кошка', author=self.user2.username),
+            [self.cats_post])
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при правке и удалении поста"""
+        dog_post = Post.objects.get(pk=self.dog_post.pk)
+        dog_post.text = 'Собака смотрит на кошку.'
+        dog_post.save()
+        self.assertIn(dog_post, search_posts('смотрит'))
+        self.assertNotIn(dog_post, search_posts('гуляет'))
+        Post.objects.get(pk=self.cat_post.pk).delete()
+        self.assertEqual(list(search_posts('окне')), [])
+
+    def test_search_pagination_keeps_query(self):
+        """Ссылки на страницы выдачи сохраняют запрос"""
+        for i in range(PAGINATOR_CONSTANT):
+            Post.objects.create(text=f'Кошка номер {i}.', author=self.user)
+        for order in ('rank', 'date'):
+            with self.subTest(order=order):
+                response = self.guest_client.get(
+                    self.reverse_search, {'q': 'кошка', 'order': order})
+                page_obj = response.context['page_obj']
+                self.assertTrue(page_obj.has_next())
+                response = self.guest_client.get(
+                    f'{self.reverse_search}?'
+                    f'{page_obj.paginator.next_query}')
+                self.assertEqual(
+                    len(response.context['page_obj']),
+                    PAGINATOR_CONSTANT + 2 - PAGINATOR_CONSTANT)
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по тем же словам, что и на сайте"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кошка окне'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.cat_post])
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import throttling
+
+User = get_user_model()
+
+
+@override_settings(RATE_LIMITS={'post:profile_follow': ('2/m', {'GET'}),
+                                'post:post_create': '1/m'},
+                   RATE_LIMIT_LEASE=1)
+class ThrottleTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other = User.objects.create_user(username='other')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(3)]
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.other_client = Client()
+        cls.other_client.force_login(cls.other)
+
+    def setUp(self):
+        cache.clear()
+        throttling.clear()
+
+    def tearDown(self):
+        throttling.clear()
+
+    def follow(self, client, author):
+        return client.get(
+            reverse('post:profile_follow', args=[author.username]))
+
+    def test_too_many_requests(self):
+        """Сверх лимита — 429 с Retry-After, другие пользователи свободны"""
+        for author in self.authors[:2]:
+            self.assertEqual(
+                self.follow(self.reader_client, author).status_code, 302)
+        response = self.follow(self.reader_client, self.authors[2])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(
+            self.follow(self.other_client, self.authors[2]).status_code,
+            302)
+        self.assertEqual(self.reader_client.get(
+            reverse('post:index')).status_code, 200)
+
+    def test_safe_methods_not_charged(self):
+        """Открытие формы не тратит лимит на её отправку"""
+        reverse_post_create = reverse('post:post_create')
+        for _ in range(3):
+            self.assertEqual(
+                self.reader_client.get(reverse_post_create).status_code, 200)
+        data = {'text': 'Test post.'}
+        self.assertEqual(self.reader_client.post(
+            reverse_post_create, data).status_code, 302)
+        self.assertEqual(self.reader_client.post(
+            reverse_post_create, data).status_code, 429)
+
+    def test_bucket_refills(self):
+        """Токены возвращаются со временем, но не больше размера корзины"""
+        key, now = 'bucket', 1000.0
+        self.assertEqual(throttling.take(key, '2/m', 3, now=now), (2, 30.0))
+        self.assertEqual(throttling.take(key, '2/m', 1, now=now + 30)[0], 1)
+        self.assertEqual(throttling.take(key, '2/m', 1, now=now + 30)[0], 0)
+        # За долгий простой корзина наполняется только до двух токенов.
+        self.assertEqual(throttling.take(key, '2/m', 5, now=now + 600)[0], 2)
+
+    @override_settings(RATE_LIMIT_LEASE=3)
+    def test_lease(self):
+        """Арендованные токены тратятся без кеша, остаток возвращается"""
+        key, now = 'leased', 1000.0
+        self.assertEqual(throttling.allow(key, '5/m', now), (True, 0.0))
+        self.assertEqual(cache.get('throttle:leased:spent'), 3)
+        cache.clear()
+        self.assertTrue(throttling.allow(key, '5/m', now)[0])
+        self.assertTrue(throttling.allow(key, '5/m', now)[0])
+        self.assertIsNone(cache.get('throttle:leased:spent'))
+        # Аренда истекла: неизрасходованного не осталось, берётся новая.
+        self.assertTrue(throttling.allow(key, '5/m', now + 2)[0])
+        self.assertEqual(cache.get('throttle:leased:spent'), 3)
+
+    def test_denial_is_remembered(self):
+        """Отказ повторяется локально до Retry-After"""
+        key, now = 'denied', 1000.0
+        self.assertTrue(throttling.allow(key, '1/m', now)[0])
+        self.assertEqual(throttling.allow(key, '1/m', now), (False, 60.0))
+        cache.clear()
+        self.assertEqual(throttling.allow(key, '1/m', now + 10),
+                         (False, 50.0))
+        self.assertTrue(throttling.allow(key, '1/m', now + 60)[0])
+
+    def test_warns_about_non_atomic_cache(self):
+        """Кеш без атомарного incr даёт предупреждение при проверке"""
+        ids = [message.id for message in run_checks(tags=['caches'])]
+        self.assertNotIn('core.W001', ids)
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                'LOCATION': 'cache_table'}}):
+            ids = [message.id for message in run_checks(tags=['caches'])]
+        self.assertIn('core.W001', ids)
@@ -0,0 +1,128 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from sorl.thumbnail import default
+from PIL import Image
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Post
+from posts import thumbnails
+from posts.thumbnails import DeferredThumbnailBackend
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+# Превью режутся сразу, а не в пуле: иначе поток может писать в
+# TEMP_MEDIA_ROOT уже после его удаления.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.post = Post.objects.create(
+            text='Test post with image.',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='small.gif', content=small_gif,
+                content_type='image/gif'),
+        )
+        cls.guest_client = Client()
+        cls.reverse_index = reverse('post:index')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def thumbnail(self):
+        geometry, options = settings.POST_THUMBNAILS[0]
+        source = ImageFile(self.post.image)
+        name = DeferredThumbnailBackend()._thumbnail_name(
+            source, geometry, options)
+        return ImageFile(name, default.storage)
+
+    def test_template_does_not_generate_thumbnail(self):
+        """Шаблон не режет картинку, а показывает исходную"""
+        content = self.guest_client.get(self.reverse_index).content.decode()
+        self.assertIn(self.post.image.url, content)
+        self.assertIsNone(default.kvstore.get(self.thumbnail()))
+        self.assertFalse(self.thumbnail().exists())
+
+    def test_warm_thumbnails_command(self):
+        """Команда warm_thumbnails готовит превью для шаблонов"""
+        out = StringIO()
+        call_command('warm_thumbnails', workers=1, stdout=out)
+        self.assertIn('Готово, картинок: 1', out.getvalue())
+        thumbnail = self.thumbnail()
+        self.assertTrue(thumbnail.exists())
+        cache.clear()
+        content = self.guest_client.get(self.reverse_index).content.decode()
+        self.assertIn(thumbnail.url, content)
+        self.assertNotIn(self.post.image.url, content)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+    def test_server_timing_counts_thumbnails(self):
+        """Server-Timing показывает превью, поставленные в очередь"""
+        response = self.guest_client.get(self.reverse_index)
+        self.assertIn('thumbnails;desc="queued=1"', response['Server-Timing'])
+
+
+@override_settings(THUMBNAIL_WORKERS=2)
+class ThumbnailPoolTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        self.addCleanup(media.disable)
+        self.addCleanup(thumbnails.drain)
+        buffer = BytesIO()
+        Image.new('RGB', (4000, 3000), 'white').save(buffer, 'JPEG')
+        self.post = Post.objects.create(
+            text='Большая картинка',
+            author=User.objects.create_user(username='HasNoName'),
+            image=SimpleUploadedFile(
+                name='big.jpg', content=buffer.getvalue(),
+                content_type='image/jpeg'),
+        )
+
+    def test_feed_shows_thumbnail_once_ready(self):
+        """Лента показывает превью, как только пул его подготовил"""
+        # Превью, заказанное при публикации, забываем: лента должна
+        # застать его ещё не готовым.
+        thumbnails.drain()
+        default.kvstore.clear()
+        cache.clear()
+        content = self.client.get(reverse('post:index')).content.decode()
+        self.assertIn(self.post.image.url, content)
+        thumbnails.drain()
+        geometry, options = settings.POST_THUMBNAILS[0]
+        name = DeferredThumbnailBackend()._thumbnail_name(
+            ImageFile(self.post.image), geometry, options)
+        content = self.client.get(reverse('post:index')).content.decode()
+        self.assertIn(ImageFile(name, default.storage).url, content)
+        self.assertNotIn(self.post.image.url, content)
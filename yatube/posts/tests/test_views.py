@@ -9,6 +9,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from posts.caching import bump_generation
 from posts.models import Follow, Group, Post
 
 from yatube.settings import PAGINATOR_CONSTANT
@@ -18,7 +19,7 @@ User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class TaskPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -276,13 +277,69 @@ class TaskPagesTests(TestCase):
 
     def test_index_template_cash(self):
         """Проверяем, кешируется ли главная страница"""
-        deleted_post = Post.objects.get(pk=self.posts_data_list[14].id)
+        cached_post = Post.objects.filter(pk=self.posts_data_list[14].id)
         content_index1 = self.guest_client.get(
             self.REVERSE_LIBRARY['index']).content
-        deleted_post.delete()
+        cached_post.update(text='Changed without signals.')
         content_index2 = self.guest_client.get(
             self.REVERSE_LIBRARY['index']).content
         self.assertEqual(content_index1, content_index2)
+        cached_post.get().delete()
+        content_index3 = self.guest_client.get(
+            self.REVERSE_LIBRARY['index']).content
+        self.assertNotEqual(content_index1, content_index3)
+
+    def test_post_card_fragment_cache(self):
+        """Карточка поста берётся из кеша, пока пост не изменится"""
+        post = Post.objects.get(pk=self.posts_data_list[14].id)
+        self.guest_client.get(self.REVERSE_LIBRARY['index'])
+        Post.objects.filter(pk=post.pk).update(text='Changed silently.')
+        bump_generation()
+        content = self.guest_client.get(
+            self.REVERSE_LIBRARY['index']).content.decode()
+        self.assertIn(post.text, content)
+        self.assertNotIn('Changed silently.', content)
+        post.text = 'Changed with save.'
+        post.save()
+        content = self.guest_client.get(
+            self.REVERSE_LIBRARY['index']).content.decode()
+        self.assertIn('Changed with save.', content)
+
+    def test_feeds_etag(self):
+        """Ленты отдают ETag и отвечают 304, пока данные не изменились"""
+        for name in ('index', 'group_list', 'profile'):
+            with self.subTest(name=name):
+                response = self.guest_client.get(self.REVERSE_LIBRARY[name])
+                etag = response['ETag']
+                response = self.guest_client.get(
+                    self.REVERSE_LIBRARY[name], HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                Group.objects.create(
+                    title=name, slug=f'etag-{name}', description=name)
+                response = self.guest_client.get(
+                    self.REVERSE_LIBRARY[name], HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_post_detail_conditional_get(self):
+        """Пост отвечает 304 без рендера, пока нет правок и комментариев"""
+        url = self.REVERSE_LIBRARY['post_detail']
+        response = self.authorized_client2.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(3):
+            response = self.authorized_client2.get(
+                url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.authorized_client2.post(
+            reverse('post:add_comment',
+                    args=[self.posts_data_list[0].id]),
+            {'text': 'Новый комментарий.'})
+        response = self.authorized_client2.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый комментарий.')
 
     def test_profile_follow(self):
         response_profile_follow = self.authorized_client2.get(
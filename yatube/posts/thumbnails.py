@@ -0,0 +1,127 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core import instrumentation
+
+from .caching import bump_generation
+
+logger = logging.getLogger(__name__)
+
+_worker = threading.local()
+_lock = threading.Lock()
+_pending = set()
+_executor = None
+
+
+def generate(name):
+    """Готовит все размеры превью из POST_THUMBNAILS для картинки name.
+
+    Закешированные ленты сбрасываются: они могли попасть в кеш
+    с исходной картинкой, пока превью ещё не было.
+    """
+    _worker.active = True
+    try:
+        with instrumentation.timer('thumbnail_generated'):
+            for geometry, options in settings.POST_THUMBNAILS:
+                get_thumbnail(name, geometry, **options)
+        bump_generation()
+    except Exception:
+        logger.exception('Не удалось подготовить превью для %s', name)
+    finally:
+        _worker.active = False
+
+
+def _run(name):
+    try:
+        generate(name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails')
+        return _executor
+
+
+def _submit(name):
+    if not settings.THUMBNAIL_WORKERS:
+        generate(name)
+        return
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    _get_executor().submit(_run, name)
+
+
+def drain():
+    """Дожидается превью из очереди и закрывает пул.
+
+    Нужно тестам, которые удаляют временный MEDIA_ROOT: иначе поток пула
+    может писать в него во время удаления. Следующая задача создаст пул
+    заново.
+    """
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def enqueue(name):
+    """Ставит подготовку превью в очередь после фиксации транзакции."""
+    if name:
+        instrumentation.record('thumbnail_queued')
+        transaction.on_commit(lambda: _submit(name))
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который не режет картинки внутри запроса.
+
+    Готовое превью берётся из хранилища ключей; если его ещё нет,
+    подготовка уходит в пул потоков, а шаблон получает исходную картинку.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_ or getattr(_worker, 'active', False):
+            return super().get_thumbnail(file_, geometry_string, **options)
+        source = ImageFile(file_)
+        thumbnail = ImageFile(
+            self._thumbnail_name(source, geometry_string, options),
+            default.storage)
+        cached = default.kvstore.get(thumbnail)
+        if cached:
+            instrumentation.record('thumbnail_ready')
+            return cached
+        enqueue(source.name)
+        return source
+
+    def _thumbnail_name(self, source, geometry_string, options):
+        # Повторяет подготовку параметров из ThumbnailBackend.get_thumbnail,
+        # чтобы имя совпало с тем, под которым превью сохранит воркер.
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return self._get_thumbnail_filename(source, geometry_string, options)
@@ -0,0 +1,66 @@
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image
+
+
+class RejectedUpload(UploadedFile):
+    """Файл, чтение которого прервано из-за превышения размера."""
+
+    def __init__(self, name, content_type, size):
+        super().__init__(BytesIO(), name, content_type, size)
+
+
+class BoundedUploadHandler(FileUploadHandler):
+    """Перестаёт сохранять файл, как только он превысил POST_IMAGE_MAX_SIZE.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS: лишние куски не доходят до
+    обработчиков, которые держат файл в памяти или пишут его на диск,
+    а в request.FILES вместо файла попадает RejectedUpload.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            return RejectedUpload(
+                self.file_name, self.content_type, self.received)
+        return None
+
+
+def decodes_whole(image):
+    """Формат картинки не умеет уменьшать её при декодировании (draft)."""
+    return type(image).draft is Image.Image.draft
+
+
+def downscale(upload):
+    """Уменьшает загруженную картинку до POST_IMAGE_STORED_DIMENSIONS."""
+    limit = settings.POST_IMAGE_STORED_DIMENSIONS
+    if not limit:
+        return upload
+    width, height = upload.image.size
+    if width <= limit[0] and height <= limit[1]:
+        return upload
+    upload.seek(0)
+    buffer = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    with Image.open(upload) as image:
+        image_format = image.format
+        # Для JPEG draft() уменьшает картинку ещё при декодировании.
+        image.draft(image.mode, limit)
+        image.thumbnail(limit)
+        image.save(buffer, format=image_format)
+    size = buffer.tell()
+    buffer.seek(0)
+    return UploadedFile(buffer, upload.name, upload.content_type, size)
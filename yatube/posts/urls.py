@@ -8,6 +8,8 @@ app_name = 'post'
 urlpatterns = [
     path('', views.index, name='index'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('export/', views.export, name='export'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -23,5 +25,7 @@ urlpatterns = [
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('create/', views.post_create, name='post_create'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments, name='comments'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'), ]
@@ -0,0 +1,33 @@
+from yatube.settings import COMMENTS_PER_PAGE, PAGINATOR_CONSTANT
+
+from .paginators import CommentPaginator, CursorPaginator
+
+
+def get_page_obj(request, post_list, paginator_class=CursorPaginator,
+                 **kwargs):
+    paginator = paginator_class(
+        post_list, PAGINATOR_CONSTANT, params=request.GET, **kwargs)
+    return paginator.get_page(
+        request.GET.get('page'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
+
+def get_comments_page(request, comments):
+    """Страница ветки; ?order=new показывает сначала новые."""
+    paginator = CommentPaginator(
+        comments, COMMENTS_PER_PAGE, params=request.GET,
+        descending=request.GET.get('order') == 'new')
+    return paginator.get_page(
+        request.GET.get('page'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
+
+def chunked(items, size=500):
+    """Режет список на куски, чтобы не упереться в лимит параметров SQL."""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -1,51 +1,60 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import (Http404, HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
+from django.db import IntegrityError
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
-from django.views.decorators.cache import cache_page
 
-from yatube.settings import PAGINATOR_CONSTANT
-
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-
-
-@cache_page(20, key_prefix='index_page')
+from . import comment_buffer, rollups
+from .caching import (cache_feed, detail_post, post_etag, post_last_modified,
+                      revalidated)
+from .counters import user_stats
+from .feed import FollowFeedPaginator
+from .exporter import export_chunks, export_records, gzipped
+from .forms import CommentForm, ExportForm, PostForm, SearchForm
+from .graph import following_ids, is_following
+from .importer import RECORD_TYPES
+from .models import Comment, Follow, Group, Post, User
+from .paginators import CursorPaginator, NumberedPaginator
+from .search import search_posts
+from .utils import get_comments_page, get_page_obj
+
+
+@cache_feed('index_page')
 def index(request):
-    post_list = Post.objects.select_related('group').all()
-    paginator = Paginator(post_list, PAGINATOR_CONSTANT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    page_obj = get_page_obj(request, post_list)
     context = {
         'page_obj': page_obj,
+        'followed_authors': following_ids(request.user.pk),
+        'trending': rollups.current()['posts'],
     }
     return render(request, 'posts/index.html', context)
 
 
+@cache_feed('group_page')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, PAGINATOR_CONSTANT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = group.posts.for_feed()
+    page_obj = get_page_obj(request, post_list)
     context = {
         'group': group,
-        'page_obj': page_obj, }
+        'page_obj': page_obj,
+        'followed_authors': following_ids(request.user.pk),
+        'popular_groups': rollups.current()['groups'], }
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_feed('profile_page')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user, author=author).exists()
-    else:
-        following = False
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, PAGINATOR_CONSTANT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    post_count = post_list.count()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    following = is_following(request.user.pk, author.pk)
+    post_list = author.posts.for_feed()
+    page_obj = get_page_obj(request, post_list)
+    post_count = user_stats(author).posts
     context = {'author': author,
                'page_obj': page_obj,
                'post_count': post_count,
@@ -54,19 +63,101 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    form = SearchForm(request.GET or None)
+    post_list = Post.objects.none()
+    ranked = True
+    if form.is_valid():
+        ranked = form.cleaned_data['order'] != 'date'
+        post_list = search_posts(form.cleaned_data['q'], ranked=ranked)
+        if form.cleaned_data['group']:
+            post_list = post_list.filter(group=form.cleaned_data['group'])
+        if form.cleaned_data['author']:
+            post_list = post_list.filter(
+                author__username=form.cleaned_data['author'])
+    page_obj = get_page_obj(
+        request, post_list,
+        NumberedPaginator if ranked else CursorPaginator)
+    context = {'form': form,
+               'page_obj': page_obj,
+               'followed_authors': following_ids(request.user.pk),
+               }
+    return render(request, 'posts/search.html', context)
+
+
+@staff_member_required
+def export(request):
+    """Потоковая выгрузка для аналитики, параметры как у export_posts."""
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    data = form.cleaned_data
+    after = {kind: data[f'after_{kind}'] for kind in RECORD_TYPES}
+    chunks = export_chunks(export_records(
+        data['types'], data['since'], after), data['format'])
+    filename = f'yatube.{data["format"]}'
+    content_type = ('text/csv' if data['format'] == 'csv'
+                    else 'application/x-ndjson')
+    if data['gzip']:
+        chunks = gzipped(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def detail_etag(request, post_id):
+    # Пока свои комментарии автора ждут в буфере, страница отличается
+    # от той, что видят остальные.
+    etag = post_etag(request, post_id)
+    pending = comment_buffer.pending_count(request, post_id)
+    return f'{etag}-{pending}' if etag and pending else etag
+
+
+@revalidated(detail_etag, post_last_modified)
 def post_detail(request, post_id):
     form = CommentForm(request.POST or None)
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
-    post_count = post.author.posts.count()
+    post = detail_post(request, post_id)
+    if post is None:
+        raise Http404
+    comments = get_comments_page(request, post.comments.for_thread())
+    post_count = user_stats(post.author).posts
     context = {'post': post,
                'post_count': post_count,
                'form': form,
                'comments': comments,
+               'pending_comments': comment_buffer.pending_comments(
+                   request, post.pk),
                }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или ?format=json."""
+    comments = get_comments_page(
+        request, Comment.objects.filter(post_id=post_id).for_thread())
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    if request.GET.get('format') != 'json':
+        return render(request, 'posts/includes/comments.html',
+                      {'post_id': post_id, 'comments': comments})
+    url = reverse('post:comments', args=[post_id])
+    paginator = comments.paginator
+    return JsonResponse({
+        'comments': [{
+            'id': comment.pk,
+            'author': comment.author.username,
+            'text': comment.text,
+            'created': comment.created.isoformat(),
+        } for comment in comments],
+        'next': (f'{url}?{paginator.next_query}'
+                 if comments.has_next() else None),
+        'previous': (f'{url}?{paginator.previous_query}'
+                     if comments.has_previous() else None),
+    })
+
+
 @login_required
 def post_create(request):
     is_post_creation = True
@@ -87,7 +178,9 @@ def post_create(request):
 def post_edit(request, post_id):
     is_edit = True
     post = get_object_or_404(Post, pk=post_id)
-    form = PostForm(request.POST or None, instance=post)
+    form = PostForm(request.POST or None,
+                    files=request.FILES or None,
+                    instance=post)
     if request.method == "POST":
         if form.is_valid():
             post = form.save(commit=False)
@@ -103,7 +196,9 @@ def post_edit(request, post_id):
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
-    if form.is_valid():
+    if form.is_valid() and comment_buffer.enabled():
+        comment_buffer.submit(request, post.pk, form.cleaned_data['text'])
+    elif form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
@@ -112,11 +207,11 @@ def add_comment(request, post_id):
 
 
 @login_required
+@cache_feed('follow_page')
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, PAGINATOR_CONSTANT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_page_obj(
+        request, Post.objects.for_feed(), FollowFeedPaginator,
+        user=request.user)
     context = {
         'page_obj': page_obj,
     }
@@ -127,15 +222,21 @@ def follow_index(request):
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     user = request.user
+    # Граф подписок в кеше может отставать, поэтому запись решает база.
     if user != author:
-        Follow.objects.get_or_create(user=user, author=author)
+        try:
+            Follow.objects.create(user=user, author=author)
+        except IntegrityError:
+            # Уже подписан, возможно, параллельным запросом.
+            pass
     return redirect('post:profile', username=author.username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    user = request.user
-    deleting_follow = get_object_or_404(Follow, user=user, author=author)
-    deleting_follow.delete()
+    deleted, _ = Follow.objects.filter(
+        user=request.user, author=author).delete()
+    if not deleted:
+        raise Http404
     return redirect('post:profile', username=author.username)
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from yatube.env import cache_config, database_config
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -49,11 +51,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ThrottleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,13 +88,36 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# База задаётся адресом в DATABASE_URL, см. yatube.env.database_config:
+# sqlite:// с прагмами WAL, postgres:// или pgbouncer:// для пула
+# транзакций. Соединение живёт DATABASE_CONN_MAX_AGE секунд и перед
+# каждым запросом проверяется, если DATABASE_HEALTH_CHECKS не 0.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    'default': database_config(
+        os.getenv('DATABASE_URL',
+                  'sqlite:///' + os.path.join(BASE_DIR, 'db.sqlite3')),
+        conn_max_age=int(os.getenv('DATABASE_CONN_MAX_AGE', '60')),
+        health_checks=os.getenv('DATABASE_HEALTH_CHECKS', '1') != '0',
+    ),
 }
 
+# Реплики для чтения перечисляются через запятую в DATABASE_REPLICA_URLS,
+# см. core.routers. После записи пользователь DATABASE_PIN_SECONDS читает
+# из основной базы, поэтому окно должно быть больше отставания реплик.
+DATABASE_REPLICAS = []
+for number, url in enumerate(
+        filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(','))):
+    DATABASES[f'replica{number}'] = database_config(
+        url.strip(),
+        conn_max_age=DATABASES['default']['CONN_MAX_AGE'],
+        health_checks=DATABASES['default']['CONN_HEALTH_CHECKS'],
+    )
+    # В тестах реплика смотрит в тестовую основную базу.
+    DATABASES[f'replica{number}']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+DATABASE_PIN_SECONDS = int(os.getenv('DATABASE_PIN_SECONDS', '5'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -140,8 +168,90 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кеш задаётся адресом в CACHE_URL, см. yatube.env.cache_config. Память
+# процесса у каждого воркера своя, поэтому при нескольких воркерах нужен
+# общий кеш: file://, db://, memcached:// или redis://. Ключи получают
+# префикс CACHE_KEY_PREFIX, а смена CACHE_VERSION разом отменяет старые.
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    'default': cache_config(
+        os.getenv('CACHE_URL', 'locmem://'),
+        key_prefix=os.getenv('CACHE_KEY_PREFIX', 'yatube'),
+        version=int(os.getenv('CACHE_VERSION', '1')),
+    ),
 }
+
+# Лента подписок: посты раскладываются по читателям при публикации,
+# кроме авторов, у которых подписчиков больше FEED_FANOUT_LIMIT.
+FEED_FANOUT_LIMIT = 1000
+FEED_BACKFILL_LIMIT = 1000
+FEED_BATCH_SIZE = 500
+
+# Комментарии на странице поста и в «показать ещё».
+COMMENTS_PER_PAGE = 20
+
+# Буфер записи комментариев, см. posts.comment_buffer: 0 — комментарии
+# пишутся сразу, иначе это наибольшая задержка публикации в секундах.
+COMMENT_BUFFER_DELAY = float(os.getenv('COMMENT_BUFFER_DELAY', '0'))
+COMMENT_BUFFER_BATCH = 200
+
+# Подборки «Обсуждают сейчас» и «Популярные группы», см. posts.rollups:
+# период полураспада оценки и окно свежих постов в секундах и длина
+# списков. Пересчитывает их команда rollup_trends.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_WINDOW = 3 * 24 * 60 * 60
+TRENDING_SIZE = 5
+
+# Ленты кешируются до первого изменения данных, см. posts.caching.
+FEED_CACHE_TIMEOUT = 60 * 60
+# Подписки пользователей в кеше, см. posts.graph.
+FOLLOW_GRAPH_TIMEOUT = 60 * 60
+
+# Потоки, в которых yatube.asgi выполняет представления; с клиентами
+# работает цикл событий сервера, см. core.asgi.
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', '8'))
+
+# Частота записи, см. core.throttling: лимит «токены/период» (s, m, h, d)
+# по имени представления берётся с POST, PUT, PATCH и DELETE, а пара
+# (лимит, методы) задаёт методы явно. Процесс берёт из общей корзины по
+# RATE_LIMIT_LEASE токенов и сверяется с ней не реже раза в
+# RATE_LIMIT_LEASE_SECONDS; при 1 каждый запрос проверяется по кешу.
+# Точны лимиты только на memcached:// и redis://, см. core.W001.
+RATE_LIMITS = {
+    'post:post_create': '20/h',
+    'post:add_comment': '10/m',
+    # Подписка и отписка — ссылки, то есть GET.
+    'post:profile_follow': ('30/m', {'GET'}),
+    'post:profile_unfollow': ('30/m', {'GET'}),
+}
+RATE_LIMIT_LEASE = int(os.getenv('RATE_LIMIT_LEASE', '1'))
+RATE_LIMIT_LEASE_SECONDS = 1
+
+# Превью картинок готовятся в фоне, см. posts.thumbnails.
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+THUMBNAIL_WORKERS = 2
+
+# Загрузка картинок: файлы больше FILE_UPLOAD_MAX_MEMORY_SIZE пишутся во
+# временный файл, а больше POST_IMAGE_MAX_SIZE перестают читаться в память
+# и на диск. Размеры проверяются по заголовку, без декодирования.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.BoundedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_DIMENSIONS = (8000, 8000)
+# Больше стольких пикселей принимается только JPEG: он уменьшается ещё
+# при декодировании, а PNG, GIF и другие разворачиваются целиком.
+POST_IMAGE_MAX_DECODE_PIXELS = 24 * 1000 * 1000
+# Хранимый оригинал уменьшается до этих размеров; None — хранить как есть.
+POST_IMAGE_STORED_DIMENSIONS = (1920, 1920)
+
+# Замеры запросов, см. core.instrumentation: доля измеряемых запросов
+# (0 — выключено) и окно гистограмм на /instrumentation/ в минутах.
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv('INSTRUMENTATION_SAMPLE_RATE', '0'))
+INSTRUMENTATION_WINDOW = 15
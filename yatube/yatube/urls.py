@@ -18,12 +18,16 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import instrumentation_report
+
 urlpatterns = [
     path('', include('posts.urls', namespace='post')),
     path('admin/', admin.site.urls),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('instrumentation/', instrumentation_report, name='instrumentation'),
 ]
 
 handler404 = 'core.views.page_not_found'